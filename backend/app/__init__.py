@@ -4,17 +4,35 @@ from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_socketio import SocketIO
+from flask_caching import Cache
+from werkzeug.exceptions import HTTPException
+from sqlalchemy import text
 from datetime import datetime
+from importlib import import_module
 import os
 
 db = SQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
 socketio = SocketIO(cors_allowed_origins="*")
+cache = Cache()
+
+# Blueprint name -> URL prefix; each lives in app.routes.<name> as <name>_bp
+BLUEPRINTS = {
+    'auth': '/auth',
+    'transaction': '/transactions',
+    'dashboard': '/dashboard',
+    'ai': '/ai',
+    'admin': '/admin'
+}
 
 def create_app(config_name=None):
     app = Flask(__name__)
     
+    # Serialize responses and parse request bodies with orjson
+    from app.utils.json_provider import OrjsonProvider
+    app.json = OrjsonProvider(app)
+    
     # Load configuration
     config_name = config_name or os.getenv('FLASK_CONFIG', 'development')
     from app.config import config
@@ -25,20 +43,24 @@ def create_app(config_name=None):
     migrate.init_app(app, db)
     jwt.init_app(app)
     CORS(app)
-    socketio.init_app(app, cors_allowed_origins="*")
+    if app.config['CACHE_TYPE'] == 'SimpleCache' and not (app.debug or app.testing):
+        app.logger.warning(
+            'CACHE_TYPE=SimpleCache is per-process; with more than one worker, cache '
+            'invalidation does not reach other workers. Use RedisCache with REDIS_URL.'
+        )
+    cache.init_app(app)
+    socketio.init_app(
+        app,
+        cors_allowed_origins="*",
+        async_mode=app.config['SOCKETIO_ASYNC_MODE'],
+        message_queue=app.config['SOCKETIO_MESSAGE_QUEUE']
+    )
     
-    # Register blueprints
-    from app.routes.auth import auth_bp
-    from app.routes.transaction import transaction_bp
-    from app.routes.dashboard import dashboard_bp
-    from app.routes.ai import ai_bp
-    from app.routes.admin import admin_bp
-    
-    app.register_blueprint(auth_bp, url_prefix='/auth')
-    app.register_blueprint(transaction_bp, url_prefix='/transactions')
-    app.register_blueprint(dashboard_bp, url_prefix='/dashboard')
-    app.register_blueprint(ai_bp, url_prefix='/ai')
-    app.register_blueprint(admin_bp, url_prefix='/admin')
+    # Register blueprints, importing only the route modules that are enabled
+    enabled_blueprints = app.config['ENABLED_BLUEPRINTS']
+    for name in enabled_blueprints:
+        module = import_module(f'app.routes.{name}')
+        app.register_blueprint(getattr(module, f'{name}_bp'), url_prefix=BLUEPRINTS[name])
     
     # Import models to ensure they are registered
     from app.models import user, transaction
@@ -46,6 +68,15 @@ def create_app(config_name=None):
     # Import socket events
     from app import socketio_events
     
+    # Unhandled errors roll back the session and return a JSON 500;
+    # HTTP errors (404, 405, malformed JSON bodies, ...) keep their status as JSON
+    @app.errorhandler(Exception)
+    def handle_unexpected_error(error):
+        if isinstance(error, HTTPException):
+            return jsonify({'error': error.description}), error.code
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+    
     # Add root route
     @app.route('/')
     def index():
@@ -54,11 +85,8 @@ def create_app(config_name=None):
             'version': '1.0.0',
             'status': 'running',
             'endpoints': {
-                'auth': '/auth',
-                'transactions': '/transactions',
-                'dashboard': '/dashboard',
-                'ai': '/ai',
-                'admin': '/admin'
+                BLUEPRINTS[name].lstrip('/'): BLUEPRINTS[name]
+                for name in enabled_blueprints
             }
         })
     
@@ -70,4 +98,20 @@ def create_app(config_name=None):
             'timestamp': datetime.utcnow().isoformat() + 'Z'
         })
     
+    # Deep health check for ops; probes should stay on /health to avoid the DB round-trip
+    @app.route('/health/deep')
+    def health_deep():
+        try:
+            db.session.execute(text('SELECT 1'))
+            database_status = 'ok'
+        except Exception:
+            database_status = 'unreachable'
+        
+        return jsonify({
+            'status': 'healthy' if database_status == 'ok' else 'unhealthy',
+            'database': database_status,
+            'pool': db.engine.pool.status(),
+            'timestamp': datetime.utcnow().isoformat() + 'Z'
+        }), 200 if database_status == 'ok' else 503
+    
     return app
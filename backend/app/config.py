@@ -5,25 +5,59 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # Connection pool tuning
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 20)),
+        'max_overflow': int(os.getenv('DB_POOL_OVERFLOW', 30)),
+        'pool_timeout': 10,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,  # Discard stale connections before use
+        'pool_use_lifo': True,  # Reuse warm connections, let idle overflow ones close
+        'query_cache_size': int(os.getenv('DB_QUERY_CACHE_SIZE', 1200))  # Compiled SQL cache (default 500)
+    }
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     
+    # Route modules to load; drop e.g. 'ai' to skip importing it entirely
+    ENABLED_BLUEPRINTS = os.getenv('ENABLED_BLUEPRINTS', 'auth,transaction,dashboard,ai,admin').split(',')
+    
+    # Response caching (SimpleCache is per-process: per-user version bumps in one worker
+    # do not reach the others, so multi-worker deployments need RedisCache)
+    CACHE_TYPE = os.getenv('CACHE_TYPE', 'SimpleCache')
+    CACHE_REDIS_URL = os.getenv('REDIS_URL')
+    CACHE_DEFAULT_TIMEOUT = 60
+    
+    # Make un-eager-loaded relationship access raise instead of issuing a query (dev only)
+    RAISE_ON_LAZY_LOAD = False
+    
+    # Socket.IO: Redis queue to fan out across workers. eventlet (for many concurrent
+    # connections) needs monkey-patched I/O, so only main.py, which applies it, selects it
+    SOCKETIO_ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE', 'threading')
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('REDIS_URL')
+    
     # Gemini AI API Configuration
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     GEMINI_API_URL = os.getenv('GEMINI_API_URL', 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent')
+    GEMINI_TIMEOUT = float(os.getenv('GEMINI_TIMEOUT', 15))  # Seconds before falling back to rule-based advice
     
 class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.getenv('DEV_DATABASE_URL')
+    RAISE_ON_LAZY_LOAD = True
 
 class ProductionConfig(Config):
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.getenv('PROD_DATABASE_URL')
+    CACHE_TYPE = os.getenv('CACHE_TYPE', 'RedisCache')
 
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # SQLite in-memory uses a single-connection pool
+    CACHE_TYPE = 'NullCache'
+    SOCKETIO_ASYNC_MODE = 'threading'
 
 config = {
     'development': DevelopmentConfig,
@@ -27,11 +27,46 @@ class TransactionCategory(Enum):
     TRAVEL = "travel"
     OTHER_EXPENSE = "other_expense"
 
+# Categories grouped by transaction type, built once at import
+INCOME_CATEGORIES = (
+    TransactionCategory.SALARY,
+    TransactionCategory.FREELANCE,
+    TransactionCategory.BUSINESS,
+    TransactionCategory.INVESTMENT,
+    TransactionCategory.OTHER_INCOME
+)
+
+EXPENSE_CATEGORIES = (
+    TransactionCategory.FOOD,
+    TransactionCategory.TRANSPORTATION,
+    TransactionCategory.HOUSING,
+    TransactionCategory.UTILITIES,
+    TransactionCategory.HEALTHCARE,
+    TransactionCategory.ENTERTAINMENT,
+    TransactionCategory.SHOPPING,
+    TransactionCategory.EDUCATION,
+    TransactionCategory.TRAVEL,
+    TransactionCategory.OTHER_EXPENSE
+)
+
+# Serialized enum values, looked up directly instead of per-row .value access
+CATEGORY_VALUES = {category: category.value for category in TransactionCategory}
+TYPE_VALUES = {transaction_type: transaction_type.value for transaction_type in TransactionType}
+
 class Transaction(db.Model):
     __tablename__ = 'transactions'
-    
+    __table_args__ = (
+        # Per-user reads filter/order by created_at; the included columns let the
+        # dashboard aggregates (including per-type ones) be index-only scans.
+        # Platform-wide date ranges and the admin listing use the created_at index
+        db.Index('ix_transactions_user_created', 'user_id', 'created_at',
+                 postgresql_include=['type', 'category', 'amount']),
+        # /dashboard/transactions filters and orders by updated_at
+        db.Index('ix_transactions_user_updated', 'user_id', 'updated_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     amount = db.Column(DECIMAL(10, 2), nullable=False)
     category = db.Column(db.Enum(TransactionCategory), nullable=False)
     type = db.Column(db.Enum(TransactionType), nullable=False)
@@ -40,44 +75,49 @@ class Transaction(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Owner; bulk queries that need it should load it eagerly (e.g. contains_eager)
+    user = db.relationship('User', back_populates='transactions', lazy='select')
+    
     def to_dict(self):
         """Convert transaction object to dictionary"""
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'amount': float(self.amount),
-            'category': self.category.value,
-            'type': self.type.value,
-            'note': self.note,
-            'audio_memo_filename': self.audio_memo_filename,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
-        }
+        return transaction_to_dict(self)
     
     @staticmethod
     def get_categories_by_type(transaction_type):
-        """Get categories for a specific transaction type"""
+        """Get categories for a specific transaction type (shared tuple, do not mutate)"""
         if transaction_type == TransactionType.INCOME:
-            return [
-                TransactionCategory.SALARY,
-                TransactionCategory.FREELANCE,
-                TransactionCategory.BUSINESS,
-                TransactionCategory.INVESTMENT,
-                TransactionCategory.OTHER_INCOME
-            ]
-        else:
-            return [
-                TransactionCategory.FOOD,
-                TransactionCategory.TRANSPORTATION,
-                TransactionCategory.HOUSING,
-                TransactionCategory.UTILITIES,
-                TransactionCategory.HEALTHCARE,
-                TransactionCategory.ENTERTAINMENT,
-                TransactionCategory.SHOPPING,
-                TransactionCategory.EDUCATION,
-                TransactionCategory.TRAVEL,
-                TransactionCategory.OTHER_EXPENSE
-            ]
+            return INCOME_CATEGORIES
+        return EXPENSE_CATEGORIES
     
     def __repr__(self):
         return f'<Transaction {self.id}: {self.type.value} ${self.amount}>'
+
+# Columns read by transaction_to_dict, for reads that skip ORM hydration
+TRANSACTION_DICT_COLUMNS = (
+    Transaction.id,
+    Transaction.user_id,
+    Transaction.amount,
+    Transaction.category,
+    Transaction.type,
+    Transaction.note,
+    Transaction.audio_memo_filename,
+    Transaction.created_at,
+    Transaction.updated_at
+)
+
+# Most rows a transaction list returns when no ?cursor= page is requested
+TRANSACTION_LIST_MAX_ROWS = 1000
+
+def transaction_to_dict(row):
+    """Serialize a Transaction, or a row selected with TRANSACTION_DICT_COLUMNS"""
+    return {
+        'id': row.id,
+        'user_id': row.user_id,
+        'amount': float(row.amount),
+        'category': CATEGORY_VALUES[row.category],
+        'type': TYPE_VALUES[row.type],
+        'note': row.note,
+        'audio_memo_filename': row.audio_memo_filename,
+        'created_at': row.created_at.isoformat(),
+        'updated_at': row.updated_at.isoformat()
+    }
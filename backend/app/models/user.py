@@ -1,8 +1,29 @@
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 from datetime import datetime
 from enum import Enum
-from sqlalchemy import Numeric
+from sqlalchemy import Numeric, DDL, event, CheckConstraint
+from sqlalchemy.orm import validates
+import sys
+
+# Shared argon2id hasher; legacy werkzeug hashes are upgraded on next login
+password_hasher = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=2)
+
+# main.py monkey-patches with eventlet before importing the app; hashing then runs in
+# eventlet's native thread pool so it does not stall every other green thread
+if 'eventlet' in sys.modules:
+    from eventlet import patcher, tpool
+    offload_hashing = patcher.is_monkey_patched('thread')
+else:
+    offload_hashing = False
+
+def run_hasher(method, *args):
+    """Call a password hashing function, off the eventlet hub when it is running"""
+    if offload_hashing:
+        return tpool.execute(method, *args)
+    return method(*args)
 
 class UserRole(Enum):
     USER = "user"
@@ -15,8 +36,21 @@ class IncomeType(Enum):
     INVESTMENT = "investment"
     OTHER = "other"
 
+# Serialized enum values, looked up directly in to_dict (missing/None maps to None)
+ROLE_VALUES = {role: role.value for role in UserRole}
+INCOME_TYPE_VALUES = {income_type: income_type.value for income_type in IncomeType}
+
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Emails are stored lowercased so equality lookups can use the plain unique index
+        CheckConstraint('email = lower(email)', name='ck_users_email_lowercase'),
+        # Trigram indexes so the admin ILIKE '%term%' search can avoid a sequential scan
+        db.Index('ix_users_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        db.Index('ix_users_email_trgm', 'email', postgresql_using='gin',
+                 postgresql_ops={'email': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -34,16 +68,35 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Relationship with transactions
-    transactions = db.relationship('Transaction', backref='user', lazy=True, cascade='all, delete-orphan')
+    # Relationship with transactions (read through queries; loaded here only for delete cascades)
+    transactions = db.relationship('Transaction', back_populates='user', lazy='select', cascade='all, delete-orphan')
+    
+    @validates('email')
+    def normalize_email(self, key, email):
+        """Store emails trimmed and lowercased"""
+        return email.strip().lower() if email else email
     
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = run_hasher(password_hasher.hash, password)
     
     def check_password(self, password):
-        """Check if provided password matches hash"""
-        return check_password_hash(self.password_hash, password)
+        """Check if provided password matches hash, rehashing outdated hashes"""
+        if not self.password_hash.startswith('$argon2'):
+            # Legacy werkzeug (pbkdf2/scrypt) hash
+            if not run_hasher(check_password_hash, self.password_hash, password):
+                return False
+            self.set_password(password)
+            return True
+        
+        try:
+            run_hasher(password_hasher.verify, self.password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+        
+        if password_hasher.check_needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
     
     def update_profile(self, name=None, email=None, phone_number=None, profile_picture=None):
         """Update user profile information"""
@@ -76,8 +129,8 @@ class User(db.Model):
             'id': self.id,
             'name': self.name,
             'email': self.email,
-            'role': self.role.value if self.role else None,
-            'income_type': self.income_type.value if self.income_type else None,
+            'role': ROLE_VALUES.get(self.role),
+            'income_type': INCOME_TYPE_VALUES.get(self.income_type),
             'budget_goal': float(self.budget_goal) if self.budget_goal else None,
             'profile_picture': self.profile_picture,
             'phone_number': self.phone_number,
@@ -94,3 +147,10 @@ class User(db.Model):
     
     def __repr__(self):
         return f'<User {self.email}>'
+
+# gin_trgm_ops needs the pg_trgm extension before the users table is created
+event.listen(
+    User.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
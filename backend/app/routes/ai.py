@@ -1,539 +1,541 @@
 from flask import Blueprint, request, jsonify
-from app import db
-from app.models.transaction import Transaction, TransactionType, TransactionCategory
+from app import db, cache
+from app.models.transaction import Transaction, TransactionType, TransactionCategory, CATEGORY_VALUES, TYPE_VALUES
 from app.models.user import User
-from app.utils.auth_utils import token_required, get_current_user
-from sqlalchemy import func, extract, and_, desc
-from datetime import datetime, timedelta
+from app.utils.auth_utils import token_required, get_current_user_id
+from app.utils.date_filters import month_range, month_bucket
+from app.utils.user_cache import get_user_cache_version
+from sqlalchemy import func, case, select, lambda_stmt
+from datetime import datetime, date, timedelta
 from decimal import Decimal
-import calendar
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import os
 
 ai_bp = Blueprint('ai', __name__)
 
+# Shared HTTP session so Gemini calls reuse pooled keep-alive connections.
+# No retries: a failed call falls back to rule-based advice instead of
+# holding the request for several more timeouts
+gemini_session = requests.Session()
+gemini_session.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=0
+))
+
+# Seconds allowed to open the connection; GEMINI_TIMEOUT bounds the wait for the reply
+GEMINI_CONNECT_TIMEOUT = 3.05
+
+def to_decimal(value):
+    """Coerce an aggregate result (Decimal, float or None) to Decimal"""
+    if value is None:
+        return Decimal('0')
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+def monthly_sum_stmt(user_id, transaction_type, start, end):
+    """Sum of a user's transactions of one type in [start, end), built and compiled once"""
+    return lambda_stmt(
+        lambda: select(func.sum(Transaction.amount)).where(
+            Transaction.user_id == user_id,
+            Transaction.type == transaction_type,
+            Transaction.created_at >= start,
+            Transaction.created_at < end
+        )
+    )
+
+# Insight rules, evaluated in order against the metrics built in get_insights_data
+INSIGHT_RULES = [
+    (lambda m: m['spending_change'] is not None and m['spending_change'] > 20, {
+        'type': 'warning',
+        'title': 'High Spending Alert',
+        'message': 'Your spending has increased by {spending_change:.1f}% compared to last month.',
+        'recommendation': 'Consider reviewing your recent expenses and identifying areas to cut back.'
+    }),
+    (lambda m: m['spending_change'] is not None and m['spending_change'] < -20, {
+        'type': 'success',
+        'title': 'Great Job!',
+        'message': 'You\'ve reduced your spending by {spending_decrease:.1f}% compared to last month.',
+        'recommendation': 'Keep up the good work with mindful spending!'
+    }),
+    (lambda m: m['top_category_share'] is not None and m['top_category_share'] > 40, {
+        'type': 'info',
+        'title': 'Category Concentration',
+        'message': 'Your {top_category} expenses account for {top_category_share:.1f}% of your total spending.',
+        'recommendation': 'Consider diversifying your spending or finding ways to reduce {top_category} costs.'
+    }),
+    (lambda m: m['expense_ratio'] is not None and m['expense_ratio'] > 90, {
+        'type': 'warning',
+        'title': 'High Expense Ratio',
+        'message': 'You\'re spending {expense_ratio:.1f}% of your income this month.',
+        'recommendation': 'Try to aim for spending less than 80% of your income to build savings.'
+    }),
+    (lambda m: m['expense_ratio'] is not None and m['expense_ratio'] < 60, {
+        'type': 'success',
+        'title': 'Excellent Savings Rate',
+        'message': 'You\'re only spending {expense_ratio:.1f}% of your income.',
+        'recommendation': 'Great job saving! Consider investing your surplus for long-term growth.'
+    }),
+    (lambda m: m['small_purchases'] > 20, {
+        'type': 'info',
+        'title': 'Frequent Small Purchases',
+        'message': 'You made {small_purchases} small purchases (under $20) this month.',
+        'recommendation': 'These small expenses can add up. Consider tracking them more carefully.'
+    }),
+]
+
+@cache.memoize(timeout=300)
+def get_insights_data(user_id, cache_version, day):
+    """Build the insights payload; cache_version and day only scope the cache key"""
+    # Get current month data
+    now = datetime.now()
+    current_month = now.month
+    current_year = now.year
+    
+    last_month = current_month - 1 if current_month > 1 else 12
+    last_month_year = current_year if current_month > 1 else current_year - 1
+    last_month_start = month_range(last_month_year, last_month)[0]
+    month_start, month_end = month_range(current_year, current_month)
+    
+    # Last and current month totals per (month, type, category) in a single query
+    month = month_bucket(Transaction.created_at)
+    monthly_rows = db.session.execute(
+        select(
+            month.label('month'),
+            Transaction.type,
+            Transaction.category,
+            func.sum(Transaction.amount).label('total'),
+            func.sum(case((Transaction.amount < 20, 1), else_=0)).label('small_count')
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.created_at >= last_month_start,
+            Transaction.created_at < month_end
+        ).group_by(month, Transaction.type, Transaction.category)
+    ).all()
+    
+    # No activity in either month means no rule can match
+    if not monthly_rows:
+        return {
+            'insights': [],
+            'generated_at': datetime.utcnow().isoformat()
+        }
+    
+    this_month_expenses = Decimal('0')
+    last_month_expenses = Decimal('0')
+    this_month_income = Decimal('0')
+    category_totals = {}
+    frequent_small_transactions = 0
+    for row in monthly_rows:
+        if row.month == month_start:
+            if row.type == TransactionType.INCOME:
+                this_month_income += row.total
+            else:
+                this_month_expenses += row.total
+                category_totals[CATEGORY_VALUES[row.category]] = row.total
+                frequent_small_transactions += int(row.small_count)
+        elif row.month == last_month_start and row.type == TransactionType.EXPENSE:
+            last_month_expenses += row.total
+    
+    # Insights only report ratios, so switch to float once before deriving them
+    this_month_expenses = float(this_month_expenses)
+    last_month_expenses = float(last_month_expenses)
+    this_month_income = float(this_month_income)
+    category_totals = {category: float(total) for category, total in category_totals.items()}
+    
+    # Metrics the insight rules are evaluated against (None when not computable)
+    spending_change = (
+        (this_month_expenses - last_month_expenses) / last_month_expenses * 100
+        if last_month_expenses > 0 else None
+    )
+    top_category = max(category_totals, key=category_totals.get) if category_totals else None
+    metrics = {
+        'spending_change': spending_change,
+        'spending_decrease': abs(spending_change) if spending_change is not None else None,
+        'top_category': top_category,
+        'top_category_share': (
+            category_totals[top_category] / this_month_expenses * 100
+            if top_category and this_month_expenses > 0 else None
+        ),
+        'expense_ratio': this_month_expenses / this_month_income * 100 if this_month_income > 0 else None,
+        'small_purchases': frequent_small_transactions
+    }
+    
+    # Only matching rules get their text formatted
+    insights = [
+        {key: text.format(**metrics) for key, text in rule.items()}
+        for predicate, rule in INSIGHT_RULES
+        if predicate(metrics)
+    ]
+    
+    return {
+        'insights': insights,
+        'generated_at': datetime.utcnow().isoformat()
+    }
+
 @ai_bp.route('/insights', methods=['GET'])
 @token_required
 def get_insights():
     """Generate AI-powered financial insights"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        insights = []
-        
-        # Get current month data
-        now = datetime.now()
-        current_month = now.month
-        current_year = now.year
-        
-        # This month's spending analysis
-        this_month_expenses = Transaction.query.filter(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.type == TransactionType.EXPENSE,
-                extract('year', Transaction.created_at) == current_year,
-                extract('month', Transaction.created_at) == current_month
-            )
-        ).with_entities(func.sum(Transaction.amount)).scalar() or Decimal('0')
-        
-        # Last month's spending
-        last_month = current_month - 1 if current_month > 1 else 12
-        last_month_year = current_year if current_month > 1 else current_year - 1
-        
-        last_month_expenses = Transaction.query.filter(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.type == TransactionType.EXPENSE,
-                extract('year', Transaction.created_at) == last_month_year,
-                extract('month', Transaction.created_at) == last_month
-            )
-        ).with_entities(func.sum(Transaction.amount)).scalar() or Decimal('0')
-        
-        # Spending trend insight
-        if last_month_expenses > 0:
-            spending_change = ((this_month_expenses - last_month_expenses) / last_month_expenses) * 100
-            if spending_change > 20:
-                insights.append({
-                    'type': 'warning',
-                    'title': 'High Spending Alert',
-                    'message': f'Your spending has increased by {spending_change:.1f}% compared to last month.',
-                    'recommendation': 'Consider reviewing your recent expenses and identifying areas to cut back.'
-                })
-            elif spending_change < -20:
-                insights.append({
-                    'type': 'success',
-                    'title': 'Great Job!',
-                    'message': f'You\'ve reduced your spending by {abs(spending_change):.1f}% compared to last month.',
-                    'recommendation': 'Keep up the good work with mindful spending!'
-                })
-        
-        # Category spending analysis
-        category_spending = db.session.query(
+    user_id = get_current_user_id()
+    return jsonify(get_insights_data(user_id, get_user_cache_version(user_id), date.today().isoformat())), 200
+
+@cache.memoize(timeout=300)
+def get_budget_suggestions_data(user_id, target_savings_rate, cache_version, day):
+    """Build the budget suggestions payload; cache_version and day only scope the cache key"""
+    # Get last 3 months of data for analysis
+    three_months_ago = datetime.now() - timedelta(days=90)
+    
+    # Monthly totals per (month, type, category) feed both the overall and category averages
+    month = month_bucket(Transaction.created_at)
+    monthly_data = db.session.execute(
+        select(
+            month.label('month'),
+            Transaction.type,
             Transaction.category,
             func.sum(Transaction.amount).label('total')
-        ).filter(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.type == TransactionType.EXPENSE,
-                extract('year', Transaction.created_at) == current_year,
-                extract('month', Transaction.created_at) == current_month
-            )
-        ).group_by(Transaction.category).order_by(desc('total')).all()
-        
-        if category_spending:
-            top_category = category_spending[0]
-            total_expenses = sum(amount for _, amount in category_spending)
-            if total_expenses > 0:
-                percentage = (top_category.total / total_expenses) * 100
-                if percentage > 40:
-                    insights.append({
-                        'type': 'info',
-                        'title': 'Category Concentration',
-                        'message': f'Your {top_category.category.value} expenses account for {percentage:.1f}% of your total spending.',
-                        'recommendation': f'Consider diversifying your spending or finding ways to reduce {top_category.category.value} costs.'
-                    })
-        
-        # Income vs Expense analysis
-        this_month_income = Transaction.query.filter(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.type == TransactionType.INCOME,
-                extract('year', Transaction.created_at) == current_year,
-                extract('month', Transaction.created_at) == current_month
-            )
-        ).with_entities(func.sum(Transaction.amount)).scalar() or Decimal('0')
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.created_at >= three_months_ago
+        ).group_by(month, Transaction.type, Transaction.category)
+    ).all()
+    
+    # Nothing to analyse yet (e.g. a new user)
+    if not monthly_data:
+        return {
+            'suggestions': [],
+            'category_budgets': {},
+            'target_savings_rate': target_savings_rate,
+            'analysis_period': '3 months',
+            'generated_at': datetime.utcnow().isoformat()
+        }
+    
+    monthly_incomes = {}
+    monthly_expenses = {}
+    category_monthly_totals = {}
+    for row in monthly_data:
+        if row.type == TransactionType.INCOME:
+            monthly_incomes[row.month] = monthly_incomes.get(row.month, Decimal('0')) + row.total
+        else:
+            monthly_expenses[row.month] = monthly_expenses.get(row.month, Decimal('0')) + row.total
+            category_monthly_totals.setdefault(CATEGORY_VALUES[row.category], []).append(row.total)
+    
+    # Average over the months that actually had income / expenses
+    avg_monthly_income = sum(monthly_incomes.values()) / len(monthly_incomes) if monthly_incomes else Decimal('0')
+    avg_monthly_expenses = sum(monthly_expenses.values()) / len(monthly_expenses) if monthly_expenses else Decimal('0')
+    
+    # Calculate category averages (mean of each category's monthly totals)
+    category_averages = [
+        (category, sum(totals) / len(totals))
+        for category, totals in sorted(category_monthly_totals.items())
+    ]
+    
+    # Calculate target budget
+    target_total_expenses = avg_monthly_income * (100 - Decimal(str(target_savings_rate))) / 100
+    
+    suggestions = []
+    category_budgets = {}
+    
+    if avg_monthly_expenses > target_total_expenses:
+        # Need to reduce spending
+        reduction_needed = avg_monthly_expenses - target_total_expenses
+        suggestions.append({
+            'type': 'budget_overview',
+            'message': f'To achieve {target_savings_rate}% savings rate, you need to reduce spending by ${reduction_needed:.2f} per month.',
+            'current_expenses': avg_monthly_expenses,
+            'target_expenses': target_total_expenses,
+            'reduction_needed': reduction_needed
+        })
         
-        if this_month_income > 0:
-            expense_ratio = (this_month_expenses / this_month_income) * 100
-            if expense_ratio > 90:
-                insights.append({
-                    'type': 'warning',
-                    'title': 'High Expense Ratio',
-                    'message': f'You\'re spending {expense_ratio:.1f}% of your income this month.',
-                    'recommendation': 'Try to aim for spending less than 80% of your income to build savings.'
-                })
-            elif expense_ratio < 60:
-                insights.append({
-                    'type': 'success',
-                    'title': 'Excellent Savings Rate',
-                    'message': f'You\'re only spending {expense_ratio:.1f}% of your income.',
-                    'recommendation': 'Great job saving! Consider investing your surplus for long-term growth.'
+        # Suggest category-wise reductions
+        total_category_spending = sum(avg for _, avg in category_averages)
+        for category, avg_amount in category_averages:
+            proportion = avg_amount / total_category_spending if total_category_spending > 0 else 0
+            suggested_budget = target_total_expenses * proportion
+            category_budgets[category] = suggested_budget
+            
+            if avg_amount > suggested_budget:
+                reduction = avg_amount - suggested_budget
+                suggestions.append({
+                    'type': 'category_reduction',
+                    'category': category,
+                    'current_average': avg_amount,
+                    'suggested_budget': suggested_budget,
+                    'reduction_needed': reduction,
+                    'message': f'Consider reducing {category} spending by ${reduction:.2f} per month.'
                 })
+    else:
+        # Already meeting savings goal
+        current_savings_rate = ((avg_monthly_income - avg_monthly_expenses) / avg_monthly_income) * 100
+        suggestions.append({
+            'type': 'success',
+            'message': f'Great job! You\'re already saving {current_savings_rate:.1f}% of your income.',
+            'current_savings_rate': current_savings_rate
+        })
         
-        # Frequency analysis
-        frequent_small_transactions = Transaction.query.filter(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.type == TransactionType.EXPENSE,
-                Transaction.amount < 20,
-                extract('year', Transaction.created_at) == current_year,
-                extract('month', Transaction.created_at) == current_month
-            )
-        ).count()
-        
-        if frequent_small_transactions > 20:
-            insights.append({
-                'type': 'info',
-                'title': 'Frequent Small Purchases',
-                'message': f'You made {frequent_small_transactions} small purchases (under $20) this month.',
-                'recommendation': 'These small expenses can add up. Consider tracking them more carefully.'
-            })
-        
-        return jsonify({
-            'insights': insights,
-            'generated_at': datetime.utcnow().isoformat()
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': 'Internal server error'}), 500
+        # Provide maintenance budgets
+        for category, avg_amount in category_averages:
+            category_budgets[category] = avg_amount * Decimal('1.1')  # 10% buffer
+    
+    return {
+        'suggestions': suggestions,
+        'category_budgets': category_budgets,
+        'target_savings_rate': target_savings_rate,
+        'analysis_period': '3 months',
+        'generated_at': datetime.utcnow().isoformat()
+    }
 
 @ai_bp.route('/budget-suggestions', methods=['POST'])
 @token_required
 def get_budget_suggestions():
     """Generate budget suggestions based on spending patterns"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        data = request.get_json()
-        target_savings_rate = data.get('target_savings_rate', 20)  # Default 20%
-        
-        # Get last 3 months of data for analysis
-        three_months_ago = datetime.now() - timedelta(days=90)
-        
-        # Calculate average monthly income and expenses
-        monthly_data = db.session.query(
-            extract('year', Transaction.created_at).label('year'),
-            extract('month', Transaction.created_at).label('month'),
-            Transaction.type,
-            func.sum(Transaction.amount).label('total')
-        ).filter(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.created_at >= three_months_ago
-            )
-        ).group_by(
-            extract('year', Transaction.created_at),
-            extract('month', Transaction.created_at),
-            Transaction.type
-        ).all()
-        
-        # Calculate averages
-        monthly_incomes = []
-        monthly_expenses = []
-        
-        for year, month, transaction_type, total in monthly_data:
-            if transaction_type == TransactionType.INCOME:
-                monthly_incomes.append(float(total))
-            else:
-                monthly_expenses.append(float(total))
-        
-        avg_monthly_income = sum(monthly_incomes) / len(monthly_incomes) if monthly_incomes else 0
-        avg_monthly_expenses = sum(monthly_expenses) / len(monthly_expenses) if monthly_expenses else 0
-        
-        # Calculate category averages
-        category_averages = db.session.query(
-            Transaction.category,
-            func.avg(func.sum(Transaction.amount)).label('avg_amount'
-        )).filter(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.type == TransactionType.EXPENSE,
-                Transaction.created_at >= three_months_ago
-            )
-        ).group_by(
+    user_id = get_current_user_id()
+    
+    data = request.get_json()
+    target_savings_rate = data.get('target_savings_rate', 20)  # Default 20%
+    
+    return jsonify(get_budget_suggestions_data(
+        user_id, target_savings_rate, get_user_cache_version(user_id), date.today().isoformat()
+    )), 200
+
+@cache.memoize(timeout=300)
+def get_spending_forecast_data(user_id, cache_version, day):
+    """Build the spending forecast payload; cache_version and day only scope the cache key"""
+    now = datetime.now()
+    current_year = now.year
+    current_month = now.month
+    days_passed = now.day
+    month_start, month_end = month_range(current_year, current_month)
+    days_in_month = (month_end - month_start).days
+    days_remaining = days_in_month - days_passed
+    
+    # Per-category spending this month and over the preceding part of the last 3 months, in one scan
+    three_months_ago = now - timedelta(days=90)
+    is_current_month = Transaction.created_at >= month_start
+    category_totals = db.session.execute(
+        select(
             Transaction.category,
-            extract('year', Transaction.created_at),
-            extract('month', Transaction.created_at)
-        ).group_by(Transaction.category).all()
-        
-        # Calculate target budget
-        target_total_expenses = avg_monthly_income * (100 - target_savings_rate) / 100
-        
-        suggestions = []
-        category_budgets = {}
-        
-        if avg_monthly_expenses > target_total_expenses:
-            # Need to reduce spending
-            reduction_needed = avg_monthly_expenses - target_total_expenses
-            suggestions.append({
-                'type': 'budget_overview',
-                'message': f'To achieve {target_savings_rate}% savings rate, you need to reduce spending by ${reduction_needed:.2f} per month.',
-                'current_expenses': avg_monthly_expenses,
-                'target_expenses': target_total_expenses,
-                'reduction_needed': reduction_needed
-            })
-            
-            # Suggest category-wise reductions
-            total_category_spending = sum(avg for _, avg in category_averages)
-            for category, avg_amount in category_averages:
-                proportion = avg_amount / total_category_spending if total_category_spending > 0 else 0
-                suggested_budget = target_total_expenses * proportion
-                category_budgets[category.value] = suggested_budget
-                
-                if avg_amount > suggested_budget:
-                    reduction = avg_amount - suggested_budget
-                    suggestions.append({
-                        'type': 'category_reduction',
-                        'category': category.value,
-                        'current_average': avg_amount,
-                        'suggested_budget': suggested_budget,
-                        'reduction_needed': reduction,
-                        'message': f'Consider reducing {category.value} spending by ${reduction:.2f} per month.'
-                    })
-        else:
-            # Already meeting savings goal
-            current_savings_rate = ((avg_monthly_income - avg_monthly_expenses) / avg_monthly_income) * 100
-            suggestions.append({
-                'type': 'success',
-                'message': f'Great job! You\'re already saving {current_savings_rate:.1f}% of your income.',
-                'current_savings_rate': current_savings_rate
-            })
-            
-            # Provide maintenance budgets
-            for category, avg_amount in category_averages:
-                category_budgets[category.value] = avg_amount * 1.1  # 10% buffer
-        
-        return jsonify({
-            'suggestions': suggestions,
-            'category_budgets': category_budgets,
-            'target_savings_rate': target_savings_rate,
-            'analysis_period': '3 months',
-            'generated_at': datetime.utcnow().isoformat()
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': 'Internal server error'}), 500
+            func.sum(case((is_current_month, Transaction.amount), else_=0)).label('current'),
+            func.sum(case((is_current_month, 1), else_=0)).label('current_count'),
+            func.sum(case((is_current_month, 0), else_=Transaction.amount)).label('historical')
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.type == TransactionType.EXPENSE,
+            Transaction.created_at >= three_months_ago,
+            Transaction.created_at < month_end
+        ).group_by(Transaction.category)
+    ).all()
+    
+    # Category rows sum to the overall totals; only categories used this month get a forecast
+    current_month_expenses = sum((to_decimal(row.current) for row in category_totals), Decimal('0'))
+    historical_expenses = sum((to_decimal(row.historical) for row in category_totals), Decimal('0'))
+    category_spending = [
+        (CATEGORY_VALUES[row.category], to_decimal(row.current))
+        for row in category_totals if row.current_count
+    ]
+    
+    # Get daily average from current month
+    daily_average_current = current_month_expenses / days_passed if days_passed > 0 else Decimal('0')
+    
+    # Get historical daily average (last 3 months)
+    historical_days = 90 - days_passed  # Approximate
+    daily_average_historical = historical_expenses / historical_days if historical_days > 0 else Decimal('0')
+    
+    # Create different forecasting scenarios
+    forecasts = []
+    
+    # Scenario 1: Continue current month's trend
+    projected_remaining_current = daily_average_current * days_remaining
+    projected_total_current = current_month_expenses + projected_remaining_current
+    
+    forecasts.append({
+        'scenario': 'Current Trend',
+        'description': 'Based on your spending pattern this month',
+        'projected_remaining': projected_remaining_current,
+        'projected_total': projected_total_current,
+        'confidence': 'High' if days_passed >= 7 else 'Medium'
+    })
+    
+    # Scenario 2: Historical average
+    projected_remaining_historical = daily_average_historical * days_remaining
+    projected_total_historical = current_month_expenses + projected_remaining_historical
+    
+    forecasts.append({
+        'scenario': 'Historical Average',
+        'description': 'Based on your average daily spending over the last 3 months',
+        'projected_remaining': projected_remaining_historical,
+        'projected_total': projected_total_historical,
+        'confidence': 'Medium'
+    })
+    
+    # Scenario 3: Conservative (20% higher than current trend)
+    projected_remaining_conservative = projected_remaining_current * Decimal('1.2')
+    projected_total_conservative = current_month_expenses + projected_remaining_conservative
+    
+    forecasts.append({
+        'scenario': 'Conservative',
+        'description': '20% higher than current trend (for budgeting buffer)',
+        'projected_remaining': projected_remaining_conservative,
+        'projected_total': projected_total_conservative,
+        'confidence': 'High'
+    })
+    
+    category_forecasts = []
+    for category, amount in category_spending:
+        daily_avg = amount / days_passed if days_passed > 0 else Decimal('0')
+        projected_remaining = daily_avg * days_remaining
+        projected_total = amount + projected_remaining
+        
+        category_forecasts.append({
+            'category': category,
+            'current_spending': amount,
+            'projected_remaining': projected_remaining,
+            'projected_total': projected_total
+        })
+    
+    return {
+        'forecasts': forecasts,
+        'category_forecasts': category_forecasts,
+        'current_spending': current_month_expenses,
+        'days_passed': days_passed,
+        'days_remaining': days_remaining,
+        'daily_averages': {
+            'current_month': daily_average_current,
+            'historical': daily_average_historical
+        },
+        'generated_at': datetime.utcnow().isoformat()
+    }
 
 @ai_bp.route('/spending-forecast', methods=['GET'])
 @token_required
 def get_spending_forecast():
     """Forecast spending for the rest of the month"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        now = datetime.now()
-        current_year = now.year
-        current_month = now.month
-        days_passed = now.day
-        days_in_month = calendar.monthrange(current_year, current_month)[1]
-        days_remaining = days_in_month - days_passed
-        
-        # Get current month's spending so far
-        current_month_expenses = Transaction.query.filter(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.type == TransactionType.EXPENSE,
-                extract('year', Transaction.created_at) == current_year,
-                extract('month', Transaction.created_at) == current_month
-            )
-        ).with_entities(func.sum(Transaction.amount)).scalar() or Decimal('0')
-        
-        # Get daily average from current month
-        daily_average_current = float(current_month_expenses) / days_passed if days_passed > 0 else 0
-        
-        # Get historical daily average (last 3 months)
-        three_months_ago = datetime.now() - timedelta(days=90)
-        historical_expenses = Transaction.query.filter(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.type == TransactionType.EXPENSE,
-                Transaction.created_at >= three_months_ago,
-                Transaction.created_at < datetime(current_year, current_month, 1)
-            )
-        ).with_entities(func.sum(Transaction.amount)).scalar() or Decimal('0')
-        
-        historical_days = 90 - days_passed  # Approximate
-        daily_average_historical = float(historical_expenses) / historical_days if historical_days > 0 else 0
-        
-        # Create different forecasting scenarios
-        forecasts = []
-        
-        # Scenario 1: Continue current month's trend
-        projected_remaining_current = daily_average_current * days_remaining
-        projected_total_current = float(current_month_expenses) + projected_remaining_current
-        
-        forecasts.append({
-            'scenario': 'Current Trend',
-            'description': 'Based on your spending pattern this month',
-            'projected_remaining': projected_remaining_current,
-            'projected_total': projected_total_current,
-            'confidence': 'High' if days_passed >= 7 else 'Medium'
-        })
-        
-        # Scenario 2: Historical average
-        projected_remaining_historical = daily_average_historical * days_remaining
-        projected_total_historical = float(current_month_expenses) + projected_remaining_historical
-        
-        forecasts.append({
-            'scenario': 'Historical Average',
-            'description': 'Based on your average daily spending over the last 3 months',
-            'projected_remaining': projected_remaining_historical,
-            'projected_total': projected_total_historical,
-            'confidence': 'Medium'
-        })
-        
-        # Scenario 3: Conservative (20% higher than current trend)
-        projected_remaining_conservative = projected_remaining_current * 1.2
-        projected_total_conservative = float(current_month_expenses) + projected_remaining_conservative
-        
-        forecasts.append({
-            'scenario': 'Conservative',
-            'description': '20% higher than current trend (for budgeting buffer)',
-            'projected_remaining': projected_remaining_conservative,
-            'projected_total': projected_total_conservative,
-            'confidence': 'High'
-        })
-        
-        # Get category breakdown for current month
-        category_spending = db.session.query(
-            Transaction.category,
-            func.sum(Transaction.amount).label('total')
-        ).filter(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.type == TransactionType.EXPENSE,
-                extract('year', Transaction.created_at) == current_year,
-                extract('month', Transaction.created_at) == current_month
-            )
-        ).group_by(Transaction.category).all()
-        
-        category_forecasts = []
-        for category, amount in category_spending:
-            daily_avg = float(amount) / days_passed if days_passed > 0 else 0
-            projected_remaining = daily_avg * days_remaining
-            projected_total = float(amount) + projected_remaining
-            
-            category_forecasts.append({
-                'category': category.value,
-                'current_spending': float(amount),
-                'projected_remaining': projected_remaining,
-                'projected_total': projected_total
-            })
-        
-        return jsonify({
-            'forecasts': forecasts,
-            'category_forecasts': category_forecasts,
-            'current_spending': float(current_month_expenses),
-            'days_passed': days_passed,
-            'days_remaining': days_remaining,
-            'daily_averages': {
-                'current_month': daily_average_current,
-                'historical': daily_average_historical
-            },
-            'generated_at': datetime.utcnow().isoformat()
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': 'Internal server error'}), 500
+    user_id = get_current_user_id()
+    return jsonify(get_spending_forecast_data(user_id, get_user_cache_version(user_id), date.today().isoformat())), 200
 
 @ai_bp.route('/personalized-advice', methods=['POST'])
 @token_required
 def get_personalized_advice():
     """Generate personalized budgeting advice using Gemini AI"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        data = request.get_json()
-        monthly_budget_goal = data.get('monthly_budget_goal')
-        
-        # Get current month data
-        now = datetime.now()
-        current_year = now.year
-        current_month = now.month
-        
-        # Get monthly income
-        monthly_income = Transaction.query.filter(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.type == TransactionType.INCOME,
-                extract('year', Transaction.created_at) == current_year,
-                extract('month', Transaction.created_at) == current_month
-            )
-        ).with_entities(func.sum(Transaction.amount)).scalar() or Decimal('0')
-        
-        # Get last 30 days of transactions for detailed analysis
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        recent_transactions = Transaction.query.filter(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.created_at >= thirty_days_ago
-            )
-        ).order_by(Transaction.created_at.desc()).all()
-        
-        # Format transaction data for AI analysis
-        transaction_data = []
-        for transaction in recent_transactions:
-            transaction_data.append({
-                'amount': float(transaction.amount),
-                'type': transaction.type.value,
-                'category': transaction.category.value,
-                'date': transaction.created_at.strftime('%Y-%m-%d'),
-                'note': transaction.note or ''
-            })
-        
-        # Get category breakdown for current month
-        category_spending = db.session.query(
+    user_id = get_current_user_id()
+    
+    data = request.get_json()
+    monthly_budget_goal = data.get('monthly_budget_goal')
+    
+    # Get current month data
+    now = datetime.now()
+    current_year = now.year
+    current_month = now.month
+    month_start, month_end = month_range(current_year, current_month)
+    
+    # Get monthly income
+    monthly_income = db.session.execute(
+        monthly_sum_stmt(user_id, TransactionType.INCOME, month_start, month_end)
+    ).scalar() or Decimal('0')
+    
+    # Count the last 30 days of transactions by type and category in SQL
+    thirty_days_ago = now - timedelta(days=30)
+    transaction_counts = {'total': 0, 'income': 0, 'expense': 0}
+    category_frequency = {}
+    for transaction_type, category, count in db.session.execute(
+        select(
+            Transaction.type,
+            Transaction.category,
+            func.count(Transaction.id)
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.created_at >= thirty_days_ago
+        ).group_by(Transaction.type, Transaction.category)
+    ).all():
+        transaction_counts['total'] += count
+        transaction_counts[TYPE_VALUES[transaction_type]] += count
+        if transaction_type == TransactionType.EXPENSE:
+            category_frequency[CATEGORY_VALUES[category]] = count
+    
+    # Only the 20 most recent transactions are sent to the model (plain rows, no ORM objects)
+    recent_transactions = db.session.execute(
+        select(
+            Transaction.amount,
+            Transaction.type,
+            Transaction.category,
+            Transaction.created_at,
+            Transaction.note
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.created_at >= thirty_days_ago
+        ).order_by(Transaction.created_at.desc()).limit(20)
+    ).all()
+    
+    # Format transaction data for AI analysis
+    transaction_data = []
+    for transaction in recent_transactions:
+        transaction_data.append({
+            'amount': float(transaction.amount),
+            'type': TYPE_VALUES[transaction.type],
+            'category': CATEGORY_VALUES[transaction.category],
+            'date': transaction.created_at.strftime('%Y-%m-%d'),
+            'note': transaction.note or ''
+        })
+    
+    # Get category breakdown for current month
+    category_spending = db.session.execute(
+        select(
             Transaction.category,
             func.sum(Transaction.amount).label('total')
-        ).filter(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.type == TransactionType.EXPENSE,
-                extract('year', Transaction.created_at) == current_year,
-                extract('month', Transaction.created_at) == current_month
-            )
-        ).group_by(Transaction.category).all()
-        
-        category_breakdown = {}
-        for category, amount in category_spending:
-            category_breakdown[category.value] = float(amount)
-        
-        # Prepare data for AI analysis
-        analysis_data = {
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.type == TransactionType.EXPENSE,
+            Transaction.created_at >= month_start,
+            Transaction.created_at < month_end
+        ).group_by(Transaction.category)
+    ).all()
+    
+    category_breakdown = {}
+    for category, amount in category_spending:
+        category_breakdown[CATEGORY_VALUES[category]] = float(amount)
+    
+    # Prepare data for AI analysis
+    analysis_data = {
+        'monthly_income': float(monthly_income),
+        'monthly_budget_goal': monthly_budget_goal,
+        'category_breakdown': category_breakdown,
+        'recent_transactions': transaction_data,  # Last 20 transactions
+        'transaction_counts': transaction_counts,
+        'category_frequency': category_frequency,
+        'analysis_period': '30 days'
+    }
+    
+    # Generate AI advice using Gemini
+    ai_advice = generate_gemini_advice(analysis_data)
+    
+    return jsonify({
+        'advice': ai_advice,
+        'data_summary': {
             'monthly_income': float(monthly_income),
             'monthly_budget_goal': monthly_budget_goal,
-            'category_breakdown': category_breakdown,
-            'recent_transactions': transaction_data[:20],  # Last 20 transactions
-            'analysis_period': '30 days'
-        }
-        
-        # Generate AI advice using Gemini
-        ai_advice = generate_gemini_advice(analysis_data)
-        
-        return jsonify({
-            'advice': ai_advice,
-            'data_summary': {
-                'monthly_income': float(monthly_income),
-                'monthly_budget_goal': monthly_budget_goal,
-                'total_categories': len(category_breakdown),
-                'transactions_analyzed': len(transaction_data)
-            },
-            'generated_at': datetime.utcnow().isoformat()
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': 'Internal server error'}), 500
+            'total_categories': len(category_breakdown),
+            'transactions_analyzed': transaction_counts['total']
+        },
+        'generated_at': datetime.utcnow().isoformat()
+    }), 200
 
-def generate_gemini_advice(data):
-    """Generate personalized advice using Gemini AI API"""
-    try:
-        # Get API configuration
-        from flask import current_app
-        api_key = current_app.config.get('GEMINI_API_KEY')
-        api_url = current_app.config.get('GEMINI_API_URL')
-        
-        if not api_key:
-            return ["Unable to generate personalized advice at this time."]
-        
-        # Calculate total spending by category
-        total_spending = sum(data['category_breakdown'].values())
-        
-        prompt = f"""
+# Static parts of the Gemini prompt, filled in per request
+PROMPT_HEADER = """
         You are a smart and friendly personal finance assistant for an app called FinLogix. 
 
         Analyze this user's financial data and provide personalized budgeting advice:
 
-        Monthly Income: ${data['monthly_income']:.2f}
-        Monthly Budget Goal: ${data.get('monthly_budget_goal', 'Not specified')}
+        Monthly Income: ${income:.2f}
+        Monthly Budget Goal: ${goal}
         Current Month Category Spending:
         """
 
-        for category, amount in data['category_breakdown'].items():
-            percentage = (amount / total_spending * 100) if total_spending > 0 else 0
-            prompt += f"- {category}: ${amount:.2f} ({percentage:.1f}%)\n"
+PROMPT_PATTERNS = """
 
-        prompt += f"""
-
-        Recent transaction patterns from the last {data['analysis_period']}:
+        Recent transaction patterns from the last {period}:
         """
 
-        # Add recent transactions summary
-        income_count = sum(1 for t in data['recent_transactions'] if t['type'] == 'income')
-        expense_count = sum(1 for t in data['recent_transactions'] if t['type'] == 'expense')
-
-        prompt += f"- Total transactions: {len(data['recent_transactions'])} ({income_count} income, {expense_count} expenses)\n"
-
-        # Add category frequency analysis
-        category_frequency = {}
-        for transaction in data['recent_transactions']:
-            if transaction['type'] == 'expense':
-                category = transaction['category']
-                category_frequency[category] = category_frequency.get(category, 0) + 1
-
-        if category_frequency:
-            most_frequent = max(category_frequency, key=category_frequency.get)
-            prompt += f"- Most frequent spending category: {most_frequent} ({category_frequency[most_frequent]} transactions)\n"
-
-        prompt += f"""
+PROMPT_FOOTER = """
 
         Please provide exactly three short bullet points of personalized budgeting advice:
 
@@ -551,6 +553,43 @@ def generate_gemini_advice(data):
 
         Respond with exactly three short bullet points of advice. Do not include JSON or any extra formatting—just the three points. Ensure not adding headers. Just plain text.
         """
+
+def generate_gemini_advice(data):
+    """Generate personalized advice using Gemini AI API"""
+    try:
+        # Get API configuration
+        from flask import current_app
+        api_key = current_app.config.get('GEMINI_API_KEY')
+        api_url = current_app.config.get('GEMINI_API_URL')
+        
+        if not api_key:
+            return ["Unable to generate personalized advice at this time."]
+        
+        # Calculate total spending by category
+        total_spending = sum(data['category_breakdown'].values())
+        
+        parts = [PROMPT_HEADER.format(
+            income=data['monthly_income'],
+            goal=data.get('monthly_budget_goal', 'Not specified')
+        )]
+        parts.extend(
+            f"- {category}: ${amount:.2f} ({(amount / total_spending * 100) if total_spending > 0 else 0:.1f}%)\n"
+            for category, amount in data['category_breakdown'].items()
+        )
+        parts.append(PROMPT_PATTERNS.format(period=data['analysis_period']))
+
+        # Add recent transactions summary (counts aggregated in SQL by the caller)
+        transaction_counts = data['transaction_counts']
+        parts.append(f"- Total transactions: {transaction_counts['total']} ({transaction_counts['income']} income, {transaction_counts['expense']} expenses)\n")
+
+        # Add category frequency analysis
+        category_frequency = data['category_frequency']
+        if category_frequency:
+            most_frequent = max(category_frequency, key=category_frequency.get)
+            parts.append(f"- Most frequent spending category: {most_frequent} ({category_frequency[most_frequent]} transactions)\n")
+
+        parts.append(PROMPT_FOOTER)
+        prompt = ''.join(parts)
         
         # Make API call to Gemini
         headers = {
@@ -569,13 +608,12 @@ def generate_gemini_advice(data):
             ]
         }
         
-        response = requests.post(
+        response = gemini_session.post(
             f"{api_url}?key={api_key}",
             headers=headers,
             json=payload,
-            timeout=30
+            timeout=(GEMINI_CONNECT_TIMEOUT, current_app.config['GEMINI_TIMEOUT'])
         )
-        print(response.json())
         
         if response.status_code == 200:
             result = response.json()
@@ -617,7 +655,13 @@ def generate_fallback_advice(data):
     monthly_budget_goal = data.get('monthly_budget_goal')
     category_breakdown = data.get('category_breakdown', {})
     
-    total_spending = sum(category_breakdown.values())
+    # Total and top category in a single pass over the breakdown
+    total_spending = 0
+    top_category, top_amount = None, None
+    for category, amount in category_breakdown.items():
+        total_spending += amount
+        if top_amount is None or amount > top_amount:
+            top_category, top_amount = category, amount
     
     # Basic spending analysis
     if monthly_income > 0:
@@ -628,14 +672,10 @@ def generate_fallback_advice(data):
             advice.append("Great job! You're maintaining a healthy spending ratio. Consider investing your surplus income for long-term financial growth.")
     
     # Category analysis
-    if category_breakdown:
-        top_category = max(category_breakdown, key=category_breakdown.get)
-        top_amount = category_breakdown[top_category]
-        
-        if total_spending > 0:
-            percentage = (top_amount / total_spending) * 100
-            if percentage > 40:
-                advice.append(f"Your {top_category} spending accounts for {percentage:.0f}% of your total expenses. Consider setting a specific budget limit for this category to better control spending.")
+    if top_category is not None and total_spending > 0:
+        percentage = (top_amount / total_spending) * 100
+        if percentage > 40:
+            advice.append(f"Your {top_category} spending accounts for {percentage:.0f}% of your total expenses. Consider setting a specific budget limit for this category to better control spending.")
     
     # Budget goal comparison
     if monthly_budget_goal and total_spending > monthly_budget_goal:
@@ -2,223 +2,222 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, get_jwt_identity
 from app import db
 from app.models.user import User, UserRole
-from app.utils.auth_utils import validate_email, validate_password, format_validation_error, get_current_user, token_required
+from app.utils.auth_utils import validate_email, validate_password, format_validation_error, get_current_user, get_current_user_id, token_required
+from app.utils.user_cache import bump_user_cache_version
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
 
+# Longest email the users table can store
+EMAIL_MAX_LENGTH = User.email.type.length
+
+def email_taken(email):
+    """Check whether an account already uses this email (id-only lookup on the unique index)"""
+    return db.session.query(User.id).filter_by(email=email).first() is not None
+
 @auth_bp.route('/signup', methods=['POST'])
 def signup():
     """Register a new user"""
-    try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['name', 'email', 'password']
-        errors = []
-        
-        for field in required_fields:
-            if not data.get(field):
-                errors.append(f'{field} is required')
-        
-        if errors:
-            return jsonify(format_validation_error(errors)), 400
-        
-        name = data['name'].strip()
-        email = data['email'].strip().lower()
-        password = data['password']
-        
-        # Validate email format
-        if not validate_email(email):
-            return jsonify({'error': 'Invalid email format'}), 400
-        
-        # Validate password strength
-        is_valid, message = validate_password(password)
-        if not is_valid:
-            return jsonify({'error': message}), 400
-        
-        # Check if user already exists
-        if User.query.filter_by(email=email).first():
-            return jsonify({'error': 'Email already registered'}), 409
-        
-        # Create new user
-        user = User(
-            name=name,
-            email=email,
-            role=UserRole.USER
-        )
-        user.set_password(password)
-        
-        db.session.add(user)
-        db.session.commit()
-        
-        # Create tokens
-        access_token = create_access_token(identity=str(user.id))
-        
-        return jsonify({
-            'message': 'User created successfully',
-            'user': user.to_dict(),
-            'access_token': access_token
-        }), 201
-        
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': 'Internal server error'}), 500
+    data = request.get_json()
+    
+    # Validate required fields
+    required_fields = ['name', 'email', 'password']
+    errors = []
+    
+    for field in required_fields:
+        if not data.get(field):
+            errors.append(f'{field} is required')
+    
+    if errors:
+        return jsonify(format_validation_error(errors)), 400
+    
+    name = data['name'].strip()
+    email = data['email'].strip().lower()
+    password = data['password']
+    
+    # Validate email format
+    if not validate_email(email):
+        return jsonify({'error': 'Invalid email format'}), 400
+    
+    # Validate password strength
+    is_valid, message = validate_password(password)
+    if not is_valid:
+        return jsonify({'error': message}), 400
+    
+    # Check if user already exists
+    if email_taken(email):
+        return jsonify({'error': 'Email already registered'}), 409
+    
+    # Create new user
+    user = User(
+        name=name,
+        email=email,
+        role=UserRole.USER
+    )
+    user.set_password(password)
+    
+    db.session.add(user)
+    db.session.commit()
+    
+    # Create tokens
+    access_token = create_access_token(identity=str(user.id))
+    
+    return jsonify({
+        'message': 'User created successfully',
+        'user': user.to_dict(),
+        'access_token': access_token
+    }), 201
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """Authenticate user and return JWT tokens"""
-    try:
-        data = request.get_json()
-        
-        # Validate required fields
-        if not data.get('email') or not data.get('password'):
-            return jsonify({'error': 'Email and password are required'}), 400
-        
-        email = data['email'].strip().lower()
-        password = data['password']
-        
-        # Find user by email
-        user = User.query.filter_by(email=email).first()
-        
-        if not user or not user.check_password(password):
-            return jsonify({'error': 'Invalid email or password'}), 401
-        
-        # Create tokens
-        access_token = create_access_token(identity=str(user.id))
-        
-        return jsonify({
-            'message': 'Login successful',
-            'user': user.to_dict(),
-            'access_token': access_token
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': 'Internal server error'}), 500
+    data = request.get_json()
+    
+    # Validate required fields
+    if not data.get('email') or not data.get('password'):
+        return jsonify({'error': 'Email and password are required'}), 400
+    
+    # Only a string email that fits the column can match an account; reject anything else without a query
+    if not isinstance(data['email'], str) or not isinstance(data['password'], str) \
+            or len(data['email'].strip()) > EMAIL_MAX_LENGTH:
+        return jsonify({'error': 'Invalid email or password'}), 401
+    
+    email = data['email'].strip().lower()
+    password = data['password']
+    
+    # Find user by email
+    user = User.query.filter_by(email=email).first()
+    
+    if not user or not user.check_password(password):
+        return jsonify({'error': 'Invalid email or password'}), 401
+    
+    # Persist a password hash upgraded during verification
+    if db.session.is_modified(user):
+        db.session.commit()
+    
+    # Create tokens
+    access_token = create_access_token(identity=str(user.id))
+    
+    return jsonify({
+        'message': 'Login successful',
+        'user': user.to_dict(),
+        'access_token': access_token
+    }), 200
 
 @auth_bp.route('/profile', methods=['GET'])
 @token_required
 def get_profile():
     """Get current user's profile"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        return jsonify({
-            'user': user.to_dict()
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': 'Internal server error'}), 500
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    return jsonify({
+        'user': user.to_dict()
+    }), 200
 
 @auth_bp.route('/profile', methods=['PUT'])
 @token_required
 def update_profile():
     """Update current user's profile"""
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    data = request.get_json()
+    
+    # Update allowed fields
+    if 'name' in data:
+        user.name = data['name'].strip()
+    
+    if 'email' in data:
+        new_email = data['email'].strip().lower()
+        if new_email != user.email:
+            if not validate_email(new_email):
+                return jsonify({'error': 'Invalid email format'}), 400
+            
+            # Uniqueness is enforced by the unique index when the change is committed
+            user.email = new_email
+    
+    # Update phone number
+    if 'phone_number' in data:
+        user.phone_number = data['phone_number'].strip() if data['phone_number'] else None
+    
+    # Update income type
+    if 'income_type' in data:
+        if data['income_type']:
+            try:
+                from app.models.user import IncomeType
+                user.income_type = IncomeType(data['income_type'])
+            except ValueError:
+                return jsonify({'error': 'Invalid income type'}), 400
+        else:
+            user.income_type = None
+    
+    # Update budget goal
+    if 'budget_goal' in data:
+        if data['budget_goal'] is not None:
+            try:
+                budget_goal = float(data['budget_goal'])
+                if budget_goal < 0:
+                    return jsonify({'error': 'Budget goal must be positive'}), 400
+                user.budget_goal = budget_goal
+            except (ValueError, TypeError):
+                return jsonify({'error': 'Invalid budget goal format'}), 400
+        else:
+            user.budget_goal = None
+    
+    # Update profile picture
+    if 'profile_picture' in data:
+        user.profile_picture = data['profile_picture'] if data['profile_picture'] else None
+    
+    user.updated_at = datetime.utcnow()
     try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        data = request.get_json()
-        
-        # Update allowed fields
-        if 'name' in data:
-            user.name = data['name'].strip()
-        
-        if 'email' in data:
-            new_email = data['email'].strip().lower()
-            if new_email != user.email:
-                if not validate_email(new_email):
-                    return jsonify({'error': 'Invalid email format'}), 400
-                
-                # Check if new email is already taken
-                if User.query.filter_by(email=new_email).first():
-                    return jsonify({'error': 'Email already registered'}), 409
-                
-                user.email = new_email
-        
-        # Update phone number
-        if 'phone_number' in data:
-            user.phone_number = data['phone_number'].strip() if data['phone_number'] else None
-        
-        # Update income type
-        if 'income_type' in data:
-            if data['income_type']:
-                try:
-                    from app.models.user import IncomeType
-                    user.income_type = IncomeType(data['income_type'])
-                except ValueError:
-                    return jsonify({'error': 'Invalid income type'}), 400
-            else:
-                user.income_type = None
-        
-        # Update budget goal
-        if 'budget_goal' in data:
-            if data['budget_goal'] is not None:
-                try:
-                    budget_goal = float(data['budget_goal'])
-                    if budget_goal < 0:
-                        return jsonify({'error': 'Budget goal must be positive'}), 400
-                    user.budget_goal = budget_goal
-                except (ValueError, TypeError):
-                    return jsonify({'error': 'Invalid budget goal format'}), 400
-            else:
-                user.budget_goal = None
-        
-        # Update profile picture
-        if 'profile_picture' in data:
-            user.profile_picture = data['profile_picture'] if data['profile_picture'] else None
-        
-        user.updated_at = datetime.utcnow()
         db.session.commit()
-        
-        return jsonify({
-            'message': 'Profile updated successfully',
-            'user': user.to_dict()
-        }), 200
-        
-    except Exception as e:
+    except IntegrityError:
+        # The only unique column users can change here is email
         db.session.rollback()
-        return jsonify({'error': 'Internal server error'}), 500
+        return jsonify({'error': 'Email already registered'}), 409
+    bump_user_cache_version(get_current_user_id())
+    
+    return jsonify({
+        'message': 'Profile updated successfully',
+        'user': user.to_dict()
+    }), 200
 
 @auth_bp.route('/change-password', methods=['PUT'])
 @token_required
 def change_password():
     """Change user's password"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        data = request.get_json()
-        
-        # Validate required fields
-        if not data.get('current_password') or not data.get('new_password'):
-            return jsonify({'error': 'Current password and new password are required'}), 400
-        
-        current_password = data['current_password']
-        new_password = data['new_password']
-        
-        # Verify current password
-        if not user.check_password(current_password):
-            return jsonify({'error': 'Current password is incorrect'}), 400
-        
-        # Validate new password
-        is_valid, message = validate_password(new_password)
-        if not is_valid:
-            return jsonify({'error': message}), 400
-        
-        # Update password
-        user.set_password(new_password)
-        user.updated_at = datetime.utcnow()
-        db.session.commit()
-        
-        return jsonify({
-            'message': 'Password changed successfully'
-        }), 200
-        
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': 'Internal server error'}), 500
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    data = request.get_json()
+    
+    # Validate required fields
+    if not data.get('current_password') or not data.get('new_password'):
+        return jsonify({'error': 'Current password and new password are required'}), 400
+    
+    current_password = data['current_password']
+    new_password = data['new_password']
+    
+    # Verify current password
+    if not user.check_password(current_password):
+        return jsonify({'error': 'Current password is incorrect'}), 400
+    
+    # Validate new password
+    is_valid, message = validate_password(new_password)
+    if not is_valid:
+        return jsonify({'error': message}), 400
+    
+    # Update password
+    user.set_password(new_password)
+    user.updated_at = datetime.utcnow()
+    db.session.commit()
+    bump_user_cache_version(get_current_user_id())
+    
+    return jsonify({
+        'message': 'Password changed successfully'
+    }), 200
@@ -1,486 +1,446 @@
 from flask import Blueprint, request, jsonify
-from app import db
-from app.models.transaction import Transaction, TransactionType, TransactionCategory
+from app import db, cache
+from app.models.transaction import Transaction, TransactionType, TransactionCategory, CATEGORY_VALUES, TRANSACTION_DICT_COLUMNS, TRANSACTION_LIST_MAX_ROWS, transaction_to_dict
 from app.models.user import User
-from app.utils.auth_utils import token_required, get_current_user
-from sqlalchemy import func, extract, and_
-from datetime import datetime, timedelta
+from app.utils.auth_utils import token_required, get_current_user_id
+from app.utils.date_filters import month_range, resolve_date_bounds, month_bucket
+from app.utils.user_cache import get_user_cache_version
+from sqlalchemy import func, extract, and_, case, select, lambda_stmt, desc, tuple_
+from datetime import datetime
 from decimal import Decimal
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+MONTH_NAMES = (
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+)
+
+def with_date_bounds(stmt, start, end):
+    """Add optional created_at >= start / < end criteria to a lambda statement"""
+    if start:
+        stmt += lambda s: s.where(Transaction.created_at >= start)
+    if end:
+        stmt += lambda s: s.where(Transaction.created_at < end)
+    return stmt
+
+def summary_totals_stmt(user_id, start, end):
+    """Income, expenses and transaction count in one scan, compiled once per bounds combination"""
+    zero = Decimal('0')
+    return with_date_bounds(lambda_stmt(
+        lambda: select(
+            func.coalesce(
+                func.sum(case((Transaction.type == TransactionType.INCOME, Transaction.amount))), zero
+            ),
+            func.coalesce(
+                func.sum(case((Transaction.type == TransactionType.EXPENSE, Transaction.amount))), zero
+            ),
+            func.count(Transaction.id)
+        ).where(Transaction.user_id == user_id)
+    ), start, end)
+
+def recent_transactions_stmt(user_id, start, end):
+    """Five most recent transactions as plain TRANSACTION_DICT_COLUMNS rows"""
+    stmt = with_date_bounds(lambda_stmt(
+        lambda: select(*TRANSACTION_DICT_COLUMNS).where(Transaction.user_id == user_id)
+    ), start, end)
+    stmt += lambda s: s.order_by(Transaction.created_at.desc()).limit(5)
+    return stmt
+
+@cache.memoize(timeout=60)
+def get_summary_data(user_id, start, end, cache_version):
+    """Build the summary payload for [start, end) (either bound optional); cache_version only scopes the cache key"""
+    # Total income, total expenses and transaction count in a single scan
+    total_income, total_expenses, transaction_count = db.session.execute(
+        summary_totals_stmt(user_id, start, end)
+    ).one()
+    
+    # Calculate balance
+    balance = total_income - total_expenses
+    
+    # Get recent transactions (last 5) as plain rows, without loading ORM objects
+    recent_transactions = db.session.execute(recent_transactions_stmt(user_id, start, end)).all()
+    
+    return {
+        'summary': {
+            'total_income': total_income,
+            'total_expenses': total_expenses,
+            'balance': balance,
+            'transaction_count': transaction_count
+        },
+        'recent_transactions': [transaction_to_dict(row) for row in recent_transactions]
+    }
+
 @dashboard_bp.route('/summary', methods=['GET'])
 @token_required
 def get_summary():
     """Get financial summary for the user"""
+    user_id = get_current_user_id()
+    
+    # Get query parameters for date filtering
+    month = request.args.get('month', type=int)
+    year = request.args.get('year', type=int)
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    
+    # Resolve the filters to optional [start, end) bounds
     try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        # Get query parameters for date filtering
-        month = request.args.get('month', type=int)
-        year = request.args.get('year', type=int)
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        
-        # Base query for user's transactions
-        base_query = Transaction.query.filter_by(user_id=user.id)
-        
-        # Apply date range filters if provided (takes precedence over month/year)
-        if start_date and end_date:
-            try:
-                start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-                end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-                # Include the entire end date by adding 1 day and using less than
-                end_date_obj = end_date_obj + timedelta(days=1)
-                base_query = base_query.filter(
-                    and_(
-                        Transaction.created_at >= start_date_obj,
-                        Transaction.created_at < end_date_obj
-                    )
-                )
-            except ValueError:
-                return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
-        elif start_date:
-            try:
-                start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-                base_query = base_query.filter(Transaction.created_at >= start_date_obj)
-            except ValueError:
-                return jsonify({'error': 'Invalid start_date format. Use YYYY-MM-DD'}), 400
-        elif end_date:
-            try:
-                end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-                # Include the entire end date by adding 1 day and using less than
-                end_date_obj = end_date_obj + timedelta(days=1)
-                base_query = base_query.filter(Transaction.created_at < end_date_obj)
-            except ValueError:
-                return jsonify({'error': 'Invalid end_date format. Use YYYY-MM-DD'}), 400
-        # Apply traditional month/year filters if no date range is provided
-        elif year:
-            base_query = base_query.filter(extract('year', Transaction.created_at) == year)
-            if month:
-                base_query = base_query.filter(extract('month', Transaction.created_at) == month)
-        
-        # Calculate total income
-        total_income = base_query.filter_by(type=TransactionType.INCOME).with_entities(
-            func.coalesce(func.sum(Transaction.amount), Decimal('0'))
-        ).scalar()
-        
-        # Calculate total expenses
-        total_expenses = base_query.filter_by(type=TransactionType.EXPENSE).with_entities(
-            func.coalesce(func.sum(Transaction.amount), Decimal('0'))
-        ).scalar()
-        
-        # Calculate balance
-        balance = total_income - total_expenses
-        
-        # Get transaction count
-        transaction_count = base_query.count()
-        
-        # Get recent transactions (last 5)
-        recent_transactions = base_query.order_by(Transaction.created_at.desc()).limit(5).all()
-        
-        return jsonify({
-            'summary': {
-                'total_income': float(total_income),
-                'total_expenses': float(total_expenses),
-                'balance': float(balance),
-                'transaction_count': transaction_count
-            },
-            'recent_transactions': [t.to_dict() for t in recent_transactions]
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': 'Internal server error'}), 500
+        start_date_obj, end_date_obj = resolve_date_bounds(start_date, end_date, year, month)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(get_summary_data(
+        user_id, start_date_obj, end_date_obj, get_user_cache_version(user_id)
+    )), 200
+
+@cache.memoize(timeout=60)
+def get_category_breakdown_data(user_id, type_enum, start, end, cache_version):
+    """Build the category breakdown payload for [start, end) (either bound optional); cache_version only scopes the cache key"""
+    # Base query
+    query = Transaction.query.filter_by(user_id=user_id, type=type_enum)
+    if start:
+        query = query.filter(Transaction.created_at >= start)
+    if end:
+        query = query.filter(Transaction.created_at < end)
+    
+    # Group by category; the window sum gives the grand total so percentages
+    # and ordering come back from the same query
+    category_total = func.sum(Transaction.amount)
+    grand_total = func.sum(category_total).over()
+    category_data = query.with_entities(
+        Transaction.category,
+        category_total.label('total'),
+        grand_total.label('grand_total'),
+        func.coalesce(func.round(category_total * 100 / func.nullif(grand_total, 0), 2), 0).label('percentage')
+    ).group_by(Transaction.category).order_by(category_total.desc(), Transaction.category).all()
+    
+    # Format response (amounts stay Decimal; the JSON provider converts them on output)
+    breakdown = [
+        {'category': CATEGORY_VALUES[row.category], 'amount': row.total, 'percentage': row.percentage}
+        for row in category_data
+    ]
+    
+    return {
+        'breakdown': breakdown,
+        'total_amount': category_data[0].grand_total if category_data else Decimal('0'),
+        'type': type_enum.value
+    }
 
 @dashboard_bp.route('/category-breakdown', methods=['GET'])
 @token_required
 def get_category_breakdown():
     """Get spending breakdown by category"""
+    user_id = get_current_user_id()
+    
+    # Get query parameters
+    month = request.args.get('month', type=int)
+    year = request.args.get('year', type=int)
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    transaction_type = request.args.get('type', 'expense')  # Default to expenses
+    
+    # Validate transaction type
     try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        # Get query parameters
-        month = request.args.get('month', type=int)
-        year = request.args.get('year', type=int)
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        transaction_type = request.args.get('type', 'expense')  # Default to expenses
-        
-        # Validate transaction type
-        try:
-            type_enum = TransactionType(transaction_type)
-        except ValueError:
-            return jsonify({'error': 'Invalid transaction type'}), 400
-        
-        # Base query
-        query = Transaction.query.filter_by(user_id=user.id, type=type_enum)
-        
-        # Apply date range filters if provided (takes precedence over month/year)
-        if start_date and end_date:
-            try:
-                start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-                end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-                # Include the entire end date by adding 1 day and using less than
-                end_date_obj = end_date_obj + timedelta(days=1)
-                query = query.filter(
-                    and_(
-                        Transaction.created_at >= start_date_obj,
-                        Transaction.created_at < end_date_obj
-                    )
-                )
-            except ValueError:
-                return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
-        elif start_date:
-            try:
-                start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-                query = query.filter(Transaction.created_at >= start_date_obj)
-            except ValueError:
-                return jsonify({'error': 'Invalid start_date format. Use YYYY-MM-DD'}), 400
-        elif end_date:
-            try:
-                end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-                # Include the entire end date by adding 1 day and using less than
-                end_date_obj = end_date_obj + timedelta(days=1)
-                query = query.filter(Transaction.created_at < end_date_obj)
-            except ValueError:
-                return jsonify({'error': 'Invalid end_date format. Use YYYY-MM-DD'}), 400
-        # Apply traditional month/year filters if no date range is provided
-        elif year:
-            query = query.filter(extract('year', Transaction.created_at) == year)
-            if month:
-                query = query.filter(extract('month', Transaction.created_at) == month)
-        
-        # Group by category and sum amounts
-        category_data = query.with_entities(
-            Transaction.category,
-            func.sum(Transaction.amount).label('total')
-        ).group_by(Transaction.category).all()
-        
-        # Format response
-        breakdown = []
-        total_amount = Decimal('0')
-        
-        for category, amount in category_data:
-            breakdown.append({
-                'category': category.value,
-                'amount': float(amount),
-                'percentage': 0  # Will calculate after getting total
-            })
-            total_amount += amount
-        
-        # Calculate percentages
-        if total_amount > 0:
-            for item in breakdown:
-                item['percentage'] = round((item['amount'] / float(total_amount)) * 100, 2)
-        
-        # Sort by amount descending
-        breakdown.sort(key=lambda x: x['amount'], reverse=True)
-        
-        return jsonify({
-            'breakdown': breakdown,
-            'total_amount': float(total_amount),
-            'type': transaction_type
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': 'Internal server error'}), 500
+        type_enum = TransactionType(transaction_type)
+    except ValueError:
+        return jsonify({'error': 'Invalid transaction type'}), 400
+    
+    # Resolve the filters to optional [start, end) bounds
+    try:
+        start_date_obj, end_date_obj = resolve_date_bounds(start_date, end_date, year, month)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(get_category_breakdown_data(
+        user_id, type_enum, start_date_obj, end_date_obj, get_user_cache_version(user_id)
+    )), 200
+
+@cache.memoize(timeout=60)
+def get_monthly_trends_data(user_id, year, start, end, cache_version):
+    """Build the 12-month trends payload for [start, end) (either bound optional); cache_version only scopes the cache key"""
+    # Base filter conditions
+    filter_conditions = [Transaction.user_id == user_id]
+    if start:
+        filter_conditions.append(Transaction.created_at >= start)
+    if end:
+        filter_conditions.append(Transaction.created_at < end)
+    
+    # Query for monthly data, with income and expenses pivoted into columns in SQL
+    month_number = extract('month', Transaction.created_at)
+    monthly_data = db.session.query(
+        month_number.label('month'),
+        func.sum(case((Transaction.type == TransactionType.INCOME, Transaction.amount))).label('income'),
+        func.sum(case((Transaction.type == TransactionType.EXPENSE, Transaction.amount))).label('expenses')
+    ).filter(
+        and_(*filter_conditions)
+    ).group_by(month_number).all()
+    totals_by_month = {int(row.month): row for row in monthly_data}
+    
+    # Build the 12-month series (months without transactions stay at 0; amounts stay
+    # Decimal and the JSON provider converts them on output)
+    trends = []
+    for month in range(1, 13):
+        row = totals_by_month.get(month)
+        income = row.income if row and row.income is not None else 0
+        expenses = row.expenses if row and row.expenses is not None else 0
+        trends.append({
+            'month': month,
+            'month_name': MONTH_NAMES[month - 1],
+            'income': income,
+            'expenses': expenses,
+            'balance': income - expenses
+        })
+    
+    return {
+        'trends': trends,
+        'year': year
+    }
 
 @dashboard_bp.route('/monthly-trends', methods=['GET'])
 @token_required
 def get_monthly_trends():
     """Get monthly income and expense trends"""
+    user_id = get_current_user_id()
+    
+    # Get query parameters for date filtering
+    year = request.args.get('year', datetime.now().year, type=int)
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    
+    # Resolve the filters to optional [start, end) bounds
     try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        # Get query parameters for date filtering
-        year = request.args.get('year', datetime.now().year, type=int)
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        
-        # Base filter conditions
-        filter_conditions = [Transaction.user_id == user.id]
-        
-        # Apply date range filters if provided (takes precedence over year)
-        if start_date and end_date:
-            try:
-                start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-                end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-                # Include the entire end date by adding 1 day and using less than
-                end_date_obj = end_date_obj + timedelta(days=1)
-                filter_conditions.extend([
-                    Transaction.created_at >= start_date_obj,
-                    Transaction.created_at < end_date_obj
-                ])
-            except ValueError:
-                return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
-        elif start_date:
-            try:
-                start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-                filter_conditions.append(Transaction.created_at >= start_date_obj)
-            except ValueError:
-                return jsonify({'error': 'Invalid start_date format. Use YYYY-MM-DD'}), 400
-        elif end_date:
-            try:
-                end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-                # Include the entire end date by adding 1 day and using less than
-                end_date_obj = end_date_obj + timedelta(days=1)
-                filter_conditions.append(Transaction.created_at < end_date_obj)
-            except ValueError:
-                return jsonify({'error': 'Invalid end_date format. Use YYYY-MM-DD'}), 400
-        # Apply traditional year filter if no date range is provided
-        elif year:
-            filter_conditions.append(extract('year', Transaction.created_at) == year)
-        
-        # Query for monthly data
-        monthly_data = db.session.query(
-            extract('month', Transaction.created_at).label('month'),
-            Transaction.type,
-            func.sum(Transaction.amount).label('total')
-        ).filter(
-            and_(*filter_conditions)
-        ).group_by(
-            extract('month', Transaction.created_at),
-            Transaction.type
-        ).all()
-        
-        # Initialize data structure for 12 months
-        trends = []
-        for month in range(1, 13):
-            month_data = {
-                'month': month,
-                'month_name': datetime(year, month, 1).strftime('%B'),
-                'income': 0,
-                'expenses': 0,
-                'balance': 0
+        start_date_obj, end_date_obj = resolve_date_bounds(start_date, end_date, year)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(get_monthly_trends_data(
+        user_id, year, start_date_obj, end_date_obj, get_user_cache_version(user_id)
+    )), 200
+
+@cache.memoize(timeout=60)
+def get_range_stats_data(user_id, start_date, end_date, cache_version):
+    """Build the stats payload for a YYYY-MM-DD date range; cache_version only scopes the cache key"""
+    start_date_obj, end_date_obj = resolve_date_bounds(start_date, end_date)
+    
+    # Query for the specified date range
+    date_range_query = Transaction.query.filter(
+        and_(
+            Transaction.user_id == user_id,
+            Transaction.created_at >= start_date_obj,
+            Transaction.created_at < end_date_obj
+        )
+    )
+    
+    # Calculate stats for the date range from per-(type, category) totals
+    range_income = Decimal('0')
+    range_expenses = Decimal('0')
+    range_categories = {}
+    for transaction_type, category, total in date_range_query.with_entities(
+        Transaction.type,
+        Transaction.category,
+        func.sum(Transaction.amount)
+    ).group_by(Transaction.type, Transaction.category).all():
+        if transaction_type == TransactionType.INCOME:
+            range_income += total
+        else:
+            range_expenses += total
+            range_categories[category] = total
+    
+    # Get highest expense category in the date range
+    highest_expense_category = max(
+        range_categories.items(), key=lambda item: item[1], default=None
+    )
+    
+    # Get average transaction amount in the date range
+    avg_transaction = date_range_query.with_entities(
+        func.avg(Transaction.amount)
+    ).scalar()
+    
+    return {
+        'stats': {
+            'date_range': {
+                'start_date': start_date,
+                'end_date': end_date,
+                'income': range_income,
+                'expenses': range_expenses,
+                'balance': range_income - range_expenses
+            },
+            'insights': {
+                'highest_expense_category': CATEGORY_VALUES[highest_expense_category[0]] if highest_expense_category else None,
+                'highest_expense_amount': highest_expense_category[1] if highest_expense_category else 0,
+                'average_transaction_amount': avg_transaction or 0
             }
-            trends.append(month_data)
-        
-        # Populate with actual data
-        for month_num, transaction_type, total in monthly_data:
-            month_index = int(month_num) - 1  # Convert to 0-based index
-            if transaction_type == TransactionType.INCOME:
-                trends[month_index]['income'] = float(total)
+        }
+    }
+
+@cache.memoize(timeout=60)
+def get_monthly_stats_data(user_id, current_year, current_month, cache_version):
+    """Build the this-month vs last-month stats payload; cache_version only scopes the cache key"""
+    last_month = current_month - 1 if current_month > 1 else 12
+    last_month_year = current_year if current_month > 1 else current_year - 1
+    last_month_start = month_range(last_month_year, last_month)[0]
+    month_start, month_end = month_range(current_year, current_month)
+    
+    # Both months' totals per (month, type, category) in a single query
+    month = month_bucket(Transaction.created_at)
+    monthly_rows = db.session.query(
+        month.label('month'),
+        Transaction.type,
+        Transaction.category,
+        func.sum(Transaction.amount).label('total')
+    ).filter(
+        and_(
+            Transaction.user_id == user_id,
+            Transaction.created_at >= last_month_start,
+            Transaction.created_at < month_end
+        )
+    ).group_by(month, Transaction.type, Transaction.category).all()
+    
+    this_month_income = Decimal('0')
+    this_month_expenses = Decimal('0')
+    last_month_income = Decimal('0')
+    last_month_expenses = Decimal('0')
+    this_month_categories = {}
+    for row in monthly_rows:
+        if row.month == month_start:
+            if row.type == TransactionType.INCOME:
+                this_month_income += row.total
             else:
-                trends[month_index]['expenses'] = float(total)
-        
-        # Calculate balance for each month
-        for month_data in trends:
-            month_data['balance'] = month_data['income'] - month_data['expenses']
-        
-        return jsonify({
-            'trends': trends,
-            'year': year
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': 'Internal server error'}), 500
+                this_month_expenses += row.total
+                this_month_categories[row.category] = row.total
+        elif row.type == TransactionType.INCOME:
+            last_month_income += row.total
+        else:
+            last_month_expenses += row.total
+    
+    # Calculate percentage changes
+    def calculate_percentage_change(current, previous):
+        if previous == 0:
+            return 100 if current > 0 else 0
+        return round(((current - previous) / previous) * 100, 2)
+    
+    income_change = calculate_percentage_change(this_month_income, last_month_income)
+    expense_change = calculate_percentage_change(this_month_expenses, last_month_expenses)
+    
+    # Get highest expense category this month
+    highest_expense_category = max(
+        this_month_categories.items(), key=lambda item: item[1], default=None
+    )
+    
+    # Get average transaction amount
+    avg_transaction = Transaction.query.filter_by(user_id=user_id).with_entities(
+        func.avg(Transaction.amount)
+    ).scalar()
+    
+    return {
+        'stats': {
+            'this_month': {
+                'income': this_month_income,
+                'expenses': this_month_expenses,
+                'balance': this_month_income - this_month_expenses
+            },
+            'last_month': {
+                'income': last_month_income,
+                'expenses': last_month_expenses,
+                'balance': last_month_income - last_month_expenses
+            },
+            'changes': {
+                'income_change': income_change,
+                'expense_change': expense_change
+            },
+            'insights': {
+                'highest_expense_category': CATEGORY_VALUES[highest_expense_category[0]] if highest_expense_category else None,
+                'highest_expense_amount': highest_expense_category[1] if highest_expense_category else 0,
+                'average_transaction_amount': avg_transaction or 0
+            }
+        }
+    }
 
 @dashboard_bp.route('/stats', methods=['GET'])
 @token_required
 def get_stats():
     """Get various statistics about user's finances"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        # Get query parameters for date filtering
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        
-        # Get current month and year
-        now = datetime.now()
-        current_month = now.month
-        current_year = now.year
-        
-        # If date range is provided, use it instead of current/last month comparison
-        if start_date and end_date:
-            try:
-                start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-                end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-                # Include the entire end date by adding 1 day and using less than
-                end_date_obj = end_date_obj + timedelta(days=1)
-                
-                # Query for the specified date range
-                date_range_query = Transaction.query.filter(
-                    and_(
-                        Transaction.user_id == user.id,
-                        Transaction.created_at >= start_date_obj,
-                        Transaction.created_at < end_date_obj
-                    )
-                )
-                
-                # Calculate stats for the date range
-                range_income = date_range_query.filter_by(type=TransactionType.INCOME).with_entities(
-                    func.coalesce(func.sum(Transaction.amount), Decimal('0'))
-                ).scalar()
-                
-                range_expenses = date_range_query.filter_by(type=TransactionType.EXPENSE).with_entities(
-                    func.coalesce(func.sum(Transaction.amount), Decimal('0'))
-                ).scalar()
-                
-                # Get highest expense category in the date range
-                highest_expense_category = date_range_query.filter_by(type=TransactionType.EXPENSE).with_entities(
-                    Transaction.category,
-                    func.sum(Transaction.amount).label('total')
-                ).group_by(Transaction.category).order_by(func.sum(Transaction.amount).desc()).first()
-                
-                # Get average transaction amount in the date range
-                avg_transaction = date_range_query.with_entities(
-                    func.avg(Transaction.amount)
-                ).scalar()
-                
-                return jsonify({
-                    'stats': {
-                        'date_range': {
-                            'start_date': start_date,
-                            'end_date': end_date,
-                            'income': float(range_income),
-                            'expenses': float(range_expenses),
-                            'balance': float(range_income - range_expenses)
-                        },
-                        'insights': {
-                            'highest_expense_category': highest_expense_category[0].value if highest_expense_category else None,
-                            'highest_expense_amount': float(highest_expense_category[1]) if highest_expense_category else 0,
-                            'average_transaction_amount': float(avg_transaction) if avg_transaction else 0
-                        }
-                    }
-                }), 200
-                
-            except ValueError:
-                return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
-        
-        # Default behavior: current month vs last month comparison
-        # This month's transactions
-        this_month_query = Transaction.query.filter(
-            and_(
-                Transaction.user_id == user.id,
-                extract('year', Transaction.created_at) == current_year,
-                extract('month', Transaction.created_at) == current_month
-            )
-        )
-        
-        # Last month's transactions
-        last_month = current_month - 1 if current_month > 1 else 12
-        last_month_year = current_year if current_month > 1 else current_year - 1
-        
-        last_month_query = Transaction.query.filter(
-            and_(
-                Transaction.user_id == user.id,
-                extract('year', Transaction.created_at) == last_month_year,
-                extract('month', Transaction.created_at) == last_month
-            )
-        )
-        
-        # Calculate this month's stats
-        this_month_income = this_month_query.filter_by(type=TransactionType.INCOME).with_entities(
-            func.coalesce(func.sum(Transaction.amount), Decimal('0'))
-        ).scalar()
-        
-        this_month_expenses = this_month_query.filter_by(type=TransactionType.EXPENSE).with_entities(
-            func.coalesce(func.sum(Transaction.amount), Decimal('0'))
-        ).scalar()
-        
-        # Calculate last month's stats
-        last_month_income = last_month_query.filter_by(type=TransactionType.INCOME).with_entities(
-            func.coalesce(func.sum(Transaction.amount), Decimal('0'))
-        ).scalar()
-        
-        last_month_expenses = last_month_query.filter_by(type=TransactionType.EXPENSE).with_entities(
-            func.coalesce(func.sum(Transaction.amount), Decimal('0'))
-        ).scalar()
-        
-        # Calculate percentage changes
-        def calculate_percentage_change(current, previous):
-            if previous == 0:
-                return 100 if current > 0 else 0
-            return round(((current - previous) / previous) * 100, 2)
-        
-        income_change = calculate_percentage_change(this_month_income, last_month_income)
-        expense_change = calculate_percentage_change(this_month_expenses, last_month_expenses)
-        
-        # Get highest expense category this month
-        highest_expense_category = this_month_query.filter_by(type=TransactionType.EXPENSE).with_entities(
-            Transaction.category,
-            func.sum(Transaction.amount).label('total')
-        ).group_by(Transaction.category).order_by(func.sum(Transaction.amount).desc()).first()
-        
-        # Get average transaction amount
-        avg_transaction = Transaction.query.filter_by(user_id=user.id).with_entities(
-            func.avg(Transaction.amount)
-        ).scalar()
-        
-        return jsonify({
-            'stats': {
-                'this_month': {
-                    'income': float(this_month_income),
-                    'expenses': float(this_month_expenses),
-                    'balance': float(this_month_income - this_month_expenses)
-                },
-                'last_month': {
-                    'income': float(last_month_income),
-                    'expenses': float(last_month_expenses),
-                    'balance': float(last_month_income - last_month_expenses)
-                },
-                'changes': {
-                    'income_change': income_change,
-                    'expense_change': expense_change
-                },
-                'insights': {
-                    'highest_expense_category': highest_expense_category[0].value if highest_expense_category else None,
-                    'highest_expense_amount': float(highest_expense_category[1]) if highest_expense_category else 0,
-                    'average_transaction_amount': float(avg_transaction) if avg_transaction else 0
-                }
-            }
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': 'Internal server error'}), 500
+    user_id = get_current_user_id()
+    cache_version = get_user_cache_version(user_id)
+    
+    # Get query parameters for date filtering
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    
+    # If date range is provided, use it instead of current/last month comparison
+    if start_date and end_date:
+        try:
+            return jsonify(get_range_stats_data(user_id, start_date, end_date, cache_version)), 200
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    
+    # Default behavior: current month vs last month comparison
+    now = datetime.now()
+    return jsonify(get_monthly_stats_data(user_id, now.year, now.month, cache_version)), 200
+
+def encode_transaction_cursor(transaction):
+    """Build an opaque keyset cursor pointing just after the given transaction"""
+    return f'{transaction.updated_at.isoformat()}_{transaction.id}'
+
+def decode_transaction_cursor(cursor):
+    """Parse a keyset cursor into (updated_at, id), raising ValueError if malformed"""
+    updated_at, transaction_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(updated_at), int(transaction_id)
 
 @dashboard_bp.route('/transactions', methods=['GET'])
 @token_required
 def get_transactions():
     """Get transactions with optional date range filtering"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        # Get query parameters
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        
-        # Base query
-        query = Transaction.query.filter_by(user_id=user.id)
-        
-        # Apply date range filter if provided
-        if start_date and end_date:
-            try:
-                start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-                end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-                # Include the entire end date by adding 1 day and using less than
-                end_date_obj = end_date_obj + timedelta(days=1)
-                query = query.filter(
-                    and_(
-                        Transaction.updated_at >= start_date_obj,
-                        Transaction.updated_at < end_date_obj
-                    )
+    user_id = get_current_user_id()
+    
+    # Get query parameters
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    
+    # Base query, selecting just the serialized columns (plain rows, no ORM objects)
+    query = db.session.query(*TRANSACTION_DICT_COLUMNS).filter(Transaction.user_id == user_id)
+    
+    # Apply date range filter if provided
+    if start_date and end_date:
+        try:
+            start_date_obj, end_date_obj = resolve_date_bounds(start_date, end_date)
+            query = query.filter(
+                and_(
+                    Transaction.updated_at >= start_date_obj,
+                    Transaction.updated_at < end_date_obj
                 )
+            )
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    
+    # Keyset pagination (?cursor= to start, ?limit= page size) bounds the rows per request
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        query = query.order_by(desc(Transaction.updated_at), desc(Transaction.id))
+        if cursor:
+            try:
+                after_updated_at, after_id = decode_transaction_cursor(cursor)
             except ValueError:
-                return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(tuple_(Transaction.updated_at, Transaction.id) < (after_updated_at, after_id))
         
-        # Get transactions ordered by date (newest first)
-        transactions = query.order_by(Transaction.updated_at.desc()).all()
+        transactions = query.limit(limit + 1).all()
+        has_next = len(transactions) > limit
+        transactions = transactions[:limit]
         
         return jsonify({
-            'transactions': [t.to_dict() for t in transactions]
+            'transactions': [transaction_to_dict(row) for row in transactions],
+            'pagination': {
+                'limit': limit,
+                'has_next': has_next,
+                'next_cursor': encode_transaction_cursor(transactions[-1]) if has_next else None
+            }
         }), 200
-        
-    except Exception as e:
-        return jsonify({'error': 'Internal server error'}), 500
+    
+    # Get transactions ordered by date (newest first), capped for unpaginated callers
+    transactions = query.order_by(Transaction.updated_at.desc()).limit(TRANSACTION_LIST_MAX_ROWS).all()
+    
+    return jsonify({
+        'transactions': [transaction_to_dict(row) for row in transactions]
+    }), 200
@@ -1,10 +1,11 @@
 from flask import Blueprint, request, jsonify, send_file
 from app import db, socketio
-from app.models.transaction import Transaction, TransactionType, TransactionCategory
-from app.utils.auth_utils import token_required, get_current_user
+from app.models.transaction import Transaction, TransactionType, TransactionCategory, TRANSACTION_DICT_COLUMNS, TRANSACTION_LIST_MAX_ROWS, transaction_to_dict
+from app.utils.auth_utils import token_required, get_current_user_id
+from app.utils.user_cache import bump_user_cache_version
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
-from sqlalchemy import desc
+from sqlalchemy import desc, tuple_
 import os
 import uuid
 from werkzeug.utils import secure_filename
@@ -95,288 +96,279 @@ def emit_transaction_event(event_type, data, user_id):
     """Centralized socket emission"""
     socketio.emit(event_type, data, room=f'user_{user_id}')
 
-def handle_transaction_error(e):
-    """Centralized error handling"""
-    db.session.rollback()
-    return jsonify({'error': 'Internal server error'}), 500
+def encode_transaction_cursor(transaction):
+    """Build an opaque keyset cursor pointing just after the given transaction"""
+    return f'{transaction.created_at.isoformat()}_{transaction.id}'
+
+def decode_transaction_cursor(cursor):
+    """Parse a keyset cursor into (created_at, id), raising ValueError if malformed"""
+    created_at, transaction_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(created_at), int(transaction_id)
 
 @transaction_bp.route('', methods=['GET'])
 @token_required
 def get_transactions():
     """Get user's transactions"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+    user_id = get_current_user_id()
+    
+    # Plain column rows; the list never needs ORM objects
+    query = db.session.query(*TRANSACTION_DICT_COLUMNS).filter(Transaction.user_id == user_id)
+    
+    # Keyset pagination (?cursor= to start, ?limit= page size) bounds the rows per request
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        query = query.order_by(desc(Transaction.created_at), desc(Transaction.id))
+        if cursor:
+            try:
+                after_created_at, after_id = decode_transaction_cursor(cursor)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(tuple_(Transaction.created_at, Transaction.id) < (after_created_at, after_id))
         
-        transactions = Transaction.query.filter_by(user_id=user.id)\
-            .order_by(desc(Transaction.created_at)).all()
+        transactions = query.limit(limit + 1).all()
+        has_next = len(transactions) > limit
+        transactions = transactions[:limit]
         
         return jsonify({
-            'transactions': [transaction.to_dict() for transaction in transactions]
+            'transactions': [transaction_to_dict(row) for row in transactions],
+            'pagination': {
+                'limit': limit,
+                'has_next': has_next,
+                'next_cursor': encode_transaction_cursor(transactions[-1]) if has_next else None
+            }
         }), 200
-        
-    except Exception as e:
-        return handle_transaction_error(e)
+    
+    # Unpaginated callers get the newest rows, capped so one request cannot load everything
+    transactions = query.order_by(desc(Transaction.created_at))\
+        .limit(TRANSACTION_LIST_MAX_ROWS).all()
+    
+    return jsonify({
+        'transactions': [transaction_to_dict(row) for row in transactions]
+    }), 200
 
 @transaction_bp.route('', methods=['POST'])
 @token_required
 def create_transaction():
     """Create a new transaction"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        # Handle both JSON and form data
-        if request.is_json:
-            data = request.get_json()
-            audio_file = None
-        else:
-            data = request.form.to_dict()
-            audio_file = request.files.get('audio_memo')
-        
-        errors, validated_data = validate_transaction_data(data)
-        
-        if errors:
-            return jsonify({'error': 'Validation failed', 'details': errors}), 400
-        
-        # Handle audio memo upload
-        audio_filename = None
-        if audio_file:
-            audio_filename = save_audio_memo(audio_file, user.id)
-            if not audio_filename:
-                return jsonify({'error': 'Invalid audio file format'}), 400
-        
-        transaction = Transaction(
-            user_id=user.id,
-            amount=validated_data['amount'],
-            category=validated_data['category'],
-            type=validated_data['type'],
-            note=data.get('note', '').strip(),
-            audio_memo_filename=audio_filename
-        )
-        
-        db.session.add(transaction)
-        db.session.commit()
-        
-        emit_transaction_event('transaction_created', {
-            'transaction': transaction.to_dict(),
-            'user_id': user.id
-        }, user.id)
-        
-        return jsonify({
-            'message': 'Transaction created successfully',
-            'transaction': transaction.to_dict()
-        }), 201
-        
-    except Exception as e:
-        return handle_transaction_error(e)
+    user_id = get_current_user_id()
+    
+    # Handle both JSON and form data
+    if request.is_json:
+        data = request.get_json()
+        audio_file = None
+    else:
+        data = request.form.to_dict()
+        audio_file = request.files.get('audio_memo')
+    
+    errors, validated_data = validate_transaction_data(data)
+    
+    if errors:
+        return jsonify({'error': 'Validation failed', 'details': errors}), 400
+    
+    # Handle audio memo upload
+    audio_filename = None
+    if audio_file:
+        audio_filename = save_audio_memo(audio_file, user_id)
+        if not audio_filename:
+            return jsonify({'error': 'Invalid audio file format'}), 400
+    
+    transaction = Transaction(
+        user_id=user_id,
+        amount=validated_data['amount'],
+        category=validated_data['category'],
+        type=validated_data['type'],
+        note=data.get('note', '').strip(),
+        audio_memo_filename=audio_filename
+    )
+    
+    db.session.add(transaction)
+    db.session.commit()
+    bump_user_cache_version(user_id)
+    
+    emit_transaction_event('transaction_created', {
+        'transaction': transaction.to_dict(),
+        'user_id': user_id
+    }, user_id)
+    
+    return jsonify({
+        'message': 'Transaction created successfully',
+        'transaction': transaction.to_dict()
+    }), 201
 
 @transaction_bp.route('/<int:transaction_id>', methods=['GET'])
 @token_required
 def get_transaction(transaction_id):
     """Get a specific transaction"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        transaction = Transaction.query.filter_by(
-            id=transaction_id, user_id=user.id
-        ).first()
-        
-        if not transaction:
-            return jsonify({'error': 'Transaction not found'}), 404
-        
-        return jsonify({'transaction': transaction.to_dict()}), 200
-        
-    except Exception as e:
-        return handle_transaction_error(e)
+    user_id = get_current_user_id()
+    
+    transaction = Transaction.query.filter_by(
+        id=transaction_id, user_id=user_id
+    ).first()
+    
+    if not transaction:
+        return jsonify({'error': 'Transaction not found'}), 404
+    
+    return jsonify({'transaction': transaction.to_dict()}), 200
 
 @transaction_bp.route('/<int:transaction_id>', methods=['PUT'])
 @token_required
 def update_transaction(transaction_id):
     """Update a transaction"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        transaction = Transaction.query.filter_by(
-            id=transaction_id, user_id=user.id
-        ).first()
-        
-        if not transaction:
-            return jsonify({'error': 'Transaction not found'}), 404
-        
-        # Handle both JSON and form data
-        if request.is_json:
-            data = request.get_json()
-            audio_file = None
-        else:
-            data = request.form.to_dict()
-            audio_file = request.files.get('audio_memo')
-        
-        errors, validated_data = validate_transaction_data(data, is_update=True)
-        
-        if errors:
-            return jsonify({'error': 'Validation failed', 'details': errors}), 400
-        
-        # Handle audio memo upload
-        if audio_file:
-            # Delete old audio memo if exists
-            if transaction.audio_memo_filename:
-                delete_audio_memo(transaction.audio_memo_filename)
-            
-            # Save new audio memo
-            audio_filename = save_audio_memo(audio_file, user.id)
-            if not audio_filename:
-                return jsonify({'error': 'Invalid audio file format'}), 400
-            transaction.audio_memo_filename = audio_filename
-        
-        # Update fields
-        for field, value in validated_data.items():
-            if value is not None:
-                setattr(transaction, field, value)
-        
-        if 'note' in data:
-            transaction.note = data['note'].strip()
-        
-        transaction.updated_at = datetime.utcnow()
-        db.session.commit()
-        
-        emit_transaction_event('transaction_updated', {
-            'transaction': transaction.to_dict(),
-            'user_id': user.id
-        }, user.id)
-        
-        return jsonify({
-            'message': 'Transaction updated successfully',
-            'transaction': transaction.to_dict()
-        }), 200
+    user_id = get_current_user_id()
+    
+    transaction = Transaction.query.filter_by(
+        id=transaction_id, user_id=user_id
+    ).first()
+    
+    if not transaction:
+        return jsonify({'error': 'Transaction not found'}), 404
+    
+    # Handle both JSON and form data
+    if request.is_json:
+        data = request.get_json()
+        audio_file = None
+    else:
+        data = request.form.to_dict()
+        audio_file = request.files.get('audio_memo')
+    
+    errors, validated_data = validate_transaction_data(data, is_update=True)
+    
+    if errors:
+        return jsonify({'error': 'Validation failed', 'details': errors}), 400
+    
+    # Handle audio memo upload
+    if audio_file:
+        # Delete old audio memo if exists
+        if transaction.audio_memo_filename:
+            delete_audio_memo(transaction.audio_memo_filename)
         
-    except Exception as e:
-        return handle_transaction_error(e)
+        # Save new audio memo
+        audio_filename = save_audio_memo(audio_file, user_id)
+        if not audio_filename:
+            return jsonify({'error': 'Invalid audio file format'}), 400
+        transaction.audio_memo_filename = audio_filename
+    
+    # Update fields
+    for field, value in validated_data.items():
+        if value is not None:
+            setattr(transaction, field, value)
+    
+    if 'note' in data:
+        transaction.note = data['note'].strip()
+    
+    transaction.updated_at = datetime.utcnow()
+    db.session.commit()
+    bump_user_cache_version(user_id)
+    
+    emit_transaction_event('transaction_updated', {
+        'transaction': transaction.to_dict(),
+        'user_id': user_id
+    }, user_id)
+    
+    return jsonify({
+        'message': 'Transaction updated successfully',
+        'transaction': transaction.to_dict()
+    }), 200
 
 @transaction_bp.route('/<int:transaction_id>', methods=['DELETE'])
 @token_required
 def delete_transaction(transaction_id):
     """Delete a transaction"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        transaction = Transaction.query.filter_by(
-            id=transaction_id, user_id=user.id
-        ).first()
-        
-        if not transaction:
-            return jsonify({'error': 'Transaction not found'}), 404
-        
-        # Delete audio memo file if exists
-        if transaction.audio_memo_filename:
-            delete_audio_memo(transaction.audio_memo_filename)
-        
-        db.session.delete(transaction)
-        db.session.commit()
-        
-        emit_transaction_event('transaction_deleted', {
-            'transaction_id': transaction_id,
-            'user_id': user.id
-        }, user.id)
-        
-        return jsonify({'message': 'Transaction deleted successfully'}), 200
-        
-    except Exception as e:
-        return handle_transaction_error(e)
+    user_id = get_current_user_id()
+    
+    transaction = Transaction.query.filter_by(
+        id=transaction_id, user_id=user_id
+    ).first()
+    
+    if not transaction:
+        return jsonify({'error': 'Transaction not found'}), 404
+    
+    # Delete audio memo file if exists
+    if transaction.audio_memo_filename:
+        delete_audio_memo(transaction.audio_memo_filename)
+    
+    db.session.delete(transaction)
+    db.session.commit()
+    bump_user_cache_version(user_id)
+    
+    emit_transaction_event('transaction_deleted', {
+        'transaction_id': transaction_id,
+        'user_id': user_id
+    }, user_id)
+    
+    return jsonify({'message': 'Transaction deleted successfully'}), 200
 
 @transaction_bp.route('/categories', methods=['GET'])
 @token_required
 def get_categories():
     """Get available categories for transactions"""
-    try:
-        transaction_type = request.args.get('type')
-        
-        if transaction_type:
-            try:
-                type_enum = TransactionType(transaction_type)
-                categories = Transaction.get_categories_by_type(type_enum)
-                return jsonify({'categories': [cat.value for cat in categories]}), 200
-            except ValueError:
-                return jsonify({'error': 'Invalid transaction type'}), 400
-        else:
-            return jsonify({
-                'income_categories': [cat.value for cat in Transaction.get_categories_by_type(TransactionType.INCOME)],
-                'expense_categories': [cat.value for cat in Transaction.get_categories_by_type(TransactionType.EXPENSE)]
-            }), 200
-            
-    except Exception as e:
-        return handle_transaction_error(e)
+    transaction_type = request.args.get('type')
+    
+    if transaction_type:
+        try:
+            type_enum = TransactionType(transaction_type)
+            categories = Transaction.get_categories_by_type(type_enum)
+            return jsonify({'categories': [cat.value for cat in categories]}), 200
+        except ValueError:
+            return jsonify({'error': 'Invalid transaction type'}), 400
+    else:
+        return jsonify({
+            'income_categories': [cat.value for cat in Transaction.get_categories_by_type(TransactionType.INCOME)],
+            'expense_categories': [cat.value for cat in Transaction.get_categories_by_type(TransactionType.EXPENSE)]
+        }), 200
 
 @transaction_bp.route('/<int:transaction_id>/audio', methods=['GET'])
 @token_required
 def get_audio_memo(transaction_id):
     """Get audio memo for a transaction"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        transaction = Transaction.query.filter_by(
-            id=transaction_id, user_id=user.id
-        ).first()
-        
-        if not transaction:
-            return jsonify({'error': 'Transaction not found'}), 404
-        
-        if not transaction.audio_memo_filename:
-            return jsonify({'error': 'No audio memo found'}), 404
-        
-        file_path = os.path.join(os.getcwd(), AUDIO_UPLOAD_FOLDER, transaction.audio_memo_filename)
-        
-        if not os.path.exists(file_path):
-            return jsonify({'error': 'Audio file not found'}), 404
-        
-        return send_file(file_path, as_attachment=False)
-        
-    except Exception as e:
-        return handle_transaction_error(e)
+    user_id = get_current_user_id()
+    
+    transaction = Transaction.query.filter_by(
+        id=transaction_id, user_id=user_id
+    ).first()
+    
+    if not transaction:
+        return jsonify({'error': 'Transaction not found'}), 404
+    
+    if not transaction.audio_memo_filename:
+        return jsonify({'error': 'No audio memo found'}), 404
+    
+    file_path = os.path.join(os.getcwd(), AUDIO_UPLOAD_FOLDER, transaction.audio_memo_filename)
+    
+    if not os.path.exists(file_path):
+        return jsonify({'error': 'Audio file not found'}), 404
+    
+    return send_file(file_path, as_attachment=False)
 
 @transaction_bp.route('/<int:transaction_id>/audio', methods=['DELETE'])
 @token_required
 def delete_audio_memo_route(transaction_id):
     """Delete audio memo for a transaction"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        transaction = Transaction.query.filter_by(
-            id=transaction_id, user_id=user.id
-        ).first()
-        
-        if not transaction:
-            return jsonify({'error': 'Transaction not found'}), 404
-        
-        if not transaction.audio_memo_filename:
-            return jsonify({'error': 'No audio memo found'}), 404
-        
-        # Delete the audio file
-        delete_audio_memo(transaction.audio_memo_filename)
-        
-        # Update the transaction record
-        transaction.audio_memo_filename = None
-        transaction.updated_at = datetime.utcnow()
-        db.session.commit()
-        
-        emit_transaction_event('transaction_updated', {
-            'transaction': transaction.to_dict(),
-            'user_id': user.id
-        }, user.id)
-        
-        return jsonify({'message': 'Audio memo deleted successfully'}), 200
-        
-    except Exception as e:
-        return handle_transaction_error(e)
\ No newline at end of file
+    user_id = get_current_user_id()
+    
+    transaction = Transaction.query.filter_by(
+        id=transaction_id, user_id=user_id
+    ).first()
+    
+    if not transaction:
+        return jsonify({'error': 'Transaction not found'}), 404
+    
+    if not transaction.audio_memo_filename:
+        return jsonify({'error': 'No audio memo found'}), 404
+    
+    # Delete the audio file
+    delete_audio_memo(transaction.audio_memo_filename)
+    
+    # Update the transaction record
+    transaction.audio_memo_filename = None
+    transaction.updated_at = datetime.utcnow()
+    db.session.commit()
+    bump_user_cache_version(user_id)
+    
+    emit_transaction_event('transaction_updated', {
+        'transaction': transaction.to_dict(),
+        'user_id': user_id
+    }, user_id)
+    
+    return jsonify({'message': 'Audio memo deleted successfully'}), 200
\ No newline at end of file
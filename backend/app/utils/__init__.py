@@ -3,16 +3,29 @@ from .auth_utils import (
     token_required, 
     admin_required, 
     get_current_user,
+    get_current_user_id,
     validate_email,
     validate_password,
     format_validation_error
 )
+from .json_provider import OrjsonProvider
+from .date_filters import month_range, period_range, parse_date, resolve_date_bounds, month_bucket
+from .user_cache import get_user_cache_version, bump_user_cache_version
 
 __all__ = [
     'token_required',
     'admin_required', 
     'get_current_user',
+    'get_current_user_id',
     'validate_email',
     'validate_password',
-    'format_validation_error'
+    'format_validation_error',
+    'OrjsonProvider',
+    'month_range',
+    'period_range',
+    'parse_date',
+    'resolve_date_bounds',
+    'month_bucket',
+    'get_user_cache_version',
+    'bump_user_cache_version'
 ]
@@ -1,18 +1,28 @@
 from functools import wraps
-from flask import jsonify, current_app
+from flask import jsonify, current_app, g
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
+from app import db
 from app.models.user import User, UserRole
 import re
 
+# Validation patterns, compiled once at import
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+UPPERCASE_PATTERN = re.compile(r'[A-Z]')
+LOWERCASE_PATTERN = re.compile(r'[a-z]')
+DIGIT_PATTERN = re.compile(r'\d')
+
 def token_required(f):
     """Decorator to require valid JWT token"""
     @wraps(f)
     def decorated(*args, **kwargs):
         try:
             verify_jwt_in_request()
-            return f(*args, **kwargs)
+            g.user_id = int(get_jwt_identity())
         except Exception as e:
             return jsonify({'error': 'Token is invalid or expired'}), 401
+        
+        # Errors raised by the view itself go to the app's error handlers
+        return f(*args, **kwargs)
     return decorated
 
 def admin_required(f):
@@ -21,43 +31,54 @@ def admin_required(f):
     def decorated(*args, **kwargs):
         try:
             verify_jwt_in_request()
-            current_user_id = get_jwt_identity()
-            user = User.query.get(int(current_user_id))
-            
-            if not user or user.role != UserRole.ADMIN:
-                return jsonify({'error': 'Admin access required'}), 403
-                
-            return f(*args, **kwargs)
+            user = load_current_user()
         except Exception as e:
             return jsonify({'error': 'Authentication failed'}), 401
+        
+        if not user or user.role != UserRole.ADMIN:
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        return f(*args, **kwargs)
     return decorated
 
+def get_current_user_id():
+    """Get the verified JWT's user id without loading the user"""
+    if 'user_id' not in g:
+        g.user_id = int(get_jwt_identity())
+    return g.user_id
+
+def load_current_user():
+    """Load the user for the verified JWT, at most once per request"""
+    if 'current_user' not in g:
+        g.current_user = db.session.get(User, get_current_user_id())
+    return g.current_user
+
 def get_current_user():
     """Get current authenticated user"""
     try:
-        verify_jwt_in_request()
-        current_user_id = get_jwt_identity()
-        return User.query.get(int(current_user_id))
+        # The decorators have already verified the token once user_id is on g
+        if 'user_id' not in g:
+            verify_jwt_in_request()
+        return load_current_user()
     except:
         return None
 
 def validate_email(email):
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return EMAIL_PATTERN.match(email) is not None
 
 def validate_password(password):
     """Validate password strength"""
     if len(password) < 8:
         return False, "Password must be at least 8 characters long"
     
-    if not re.search(r'[A-Z]', password):
+    if not UPPERCASE_PATTERN.search(password):
         return False, "Password must contain at least one uppercase letter"
     
-    if not re.search(r'[a-z]', password):
+    if not LOWERCASE_PATTERN.search(password):
         return False, "Password must contain at least one lowercase letter"
     
-    if not re.search(r'\d', password):
+    if not DIGIT_PATTERN.search(password):
         return False, "Password must contain at least one number"
     
     return True, "Password is valid"
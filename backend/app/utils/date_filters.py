@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+from sqlalchemy import DateTime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+@lru_cache(maxsize=64)
+def month_range(year, month):
+    """Return (start, end) datetimes bounding a calendar month, end exclusive"""
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+@lru_cache(maxsize=1024)
+def parse_date(value):
+    """Parse a YYYY-MM-DD string into a midnight datetime, raising ValueError if malformed"""
+    # Fast path for the zero-padded form clients send; strptime also accepts e.g. 2024-1-5
+    if (len(value) == 10 and value[4] == '-' and value[7] == '-'
+            and value[:4].isdigit() and value[5:7].isdigit() and value[8:].isdigit()):
+        return datetime(int(value[:4]), int(value[5:7]), int(value[8:]))
+    return datetime.strptime(value, '%Y-%m-%d')
+
+def period_range(year, month=None):
+    """Return (start, end) bounding a calendar month, or the whole year if no month"""
+    if month:
+        return month_range(year, month)
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+class month_bucket(FunctionElement):
+    """SQL expression truncating a timestamp to the first instant of its month"""
+    type = DateTime()
+    name = 'month_bucket'
+    inherit_cache = True
+
+def resolve_date_bounds(start_date=None, end_date=None, year=None, month=None):
+    """Turn date query params into optional [start, end) bounds, raising ValueError with a client-facing message"""
+    # An explicit YYYY-MM-DD range (end date inclusive) takes precedence over year/month
+    if start_date and end_date:
+        try:
+            return parse_date(start_date), parse_date(end_date) + timedelta(days=1)
+        except ValueError:
+            raise ValueError('Invalid date format. Use YYYY-MM-DD') from None
+    if start_date:
+        try:
+            return parse_date(start_date), None
+        except ValueError:
+            raise ValueError('Invalid start_date format. Use YYYY-MM-DD') from None
+    if end_date:
+        try:
+            return None, parse_date(end_date) + timedelta(days=1)
+        except ValueError:
+            raise ValueError('Invalid end_date format. Use YYYY-MM-DD') from None
+    if year:
+        try:
+            return period_range(year, month)
+        except ValueError:
+            raise ValueError('Invalid month or year') from None
+    return None, None
+
+@compiles(month_bucket)
+def compile_month_bucket(element, compiler, **kw):
+    return "date_trunc('month', %s)" % compiler.process(element.clauses, **kw)
+
+@compiles(month_bucket, 'sqlite')
+def compile_month_bucket_sqlite(element, compiler, **kw):
+    return "strftime('%%Y-%%m-01 00:00:00', %s)" % compiler.process(element.clauses, **kw)
@@ -0,0 +1,29 @@
+from flask.json.provider import JSONProvider
+from decimal import Decimal
+import orjson
+
+def orjson_default(obj):
+    """Serialize types orjson does not handle natively"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider that encodes and decodes with orjson"""
+    mimetype = 'application/json'
+    
+    def dumps(self, obj, **kwargs):
+        """Serialize data as a JSON string"""
+        return orjson.dumps(obj, default=orjson_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        """Deserialize data from a JSON string or bytes"""
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        """Serialize the given arguments as JSON and return a Response"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=orjson_default, option=orjson.OPT_NON_STR_KEYS),
+            mimetype=self.mimetype
+        )
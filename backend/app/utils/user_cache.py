@@ -0,0 +1,22 @@
+from app import cache
+import time
+
+def user_cache_version_key(user_id):
+    """Cache key holding the version of a user's transaction-derived cache entries"""
+    return f'user_cache_version:{user_id}'
+
+def get_user_cache_version(user_id):
+    """Get the current cache version for a user, starting a fresh one if none is stored"""
+    key = user_cache_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # A missing key (never set, or evicted) must not fall back to a version
+        # whose memoized entries may still be cached
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=0):
+            version = cache.get(key) or version
+    return version
+
+def bump_user_cache_version(user_id):
+    """Invalidate cached per-user results by moving them to a new, never reused version"""
+    cache.set(user_cache_version_key(user_id), time.time_ns(), timeout=0)
@@ -1,10 +1,21 @@
-from app import create_app, socketio, db
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Serving through this module opts in to eventlet (the config default is threading);
+# patch blocking I/O before anything else imports sockets or threads
+os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'eventlet')
+if os.environ['SOCKETIO_ASYNC_MODE'] == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+    # psycopg2 is a C extension; make its socket waits yield to the hub too
+    from psycogreen.eventlet import patch_psycopg
+    patch_psycopg()
+
+from app import create_app, socketio, db
+
 # Create Flask app
 app = create_app()
 
@@ -20,7 +31,7 @@ def create_admin():
     from app.models.user import User, UserRole
     
     name = input("Enter admin name: ")
-    email = input("Enter admin email: ")
+    email = input("Enter admin email: ").strip().lower()  # Stored lowercased by User.normalize_email
     password = input("Enter admin password: ")
     
     # Check if admin already exists